@@ -1,6 +1,9 @@
+import sys
 import json
+import shutil
+import tempfile
+import argparse
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFDirectoryLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 import chromadb
@@ -11,6 +14,30 @@ DATA_DIR = SCRIPT_DIR  # data 폴더 안에 indexer가 있으니까
 PDF_DIR = DATA_DIR
 CHROMA_DIR = DATA_DIR / "chroma_db"
 METADATA_FILE = DATA_DIR / "metadata.json"
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+
+TRANSPOTER_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(TRANSPOTER_ROOT))
+
+from ingestion.manifest import MANIFEST_NAME, load_manifest, save_manifest, scan_pdfs, plan_changes
+from ingestion.parser import DEFAULT_TIMEOUT
+from ingestion.text_cache import ParsedTextCache, parse_with_cache
+from ingestion.pipeline import run_stages, batched
+from ingestion.embedding_cache import EmbeddingCache
+from ingestion.chunk_ids import assign_chunk_ids
+from ingestion.batching import (
+    DEFAULT_WINDOW, DEFAULT_CANDIDATES, BucketedEmbedder, sentence_transformer_encoder, load_tokenizer, token_length_fn,
+)
+from ingestion.embed_pool import EmbeddingPool
+from ingestion.benchmark import IngestStats, sample_pdfs, write_report
+from ingestion.dedup import Deduplicator
+from tools.bm25_index import BM25_FILE, BM25Index
+from tools.collection_version import bump_version
+from tools.chroma_client import get_memmap_mirror
+
+MANIFEST_FILE = CHROMA_DIR / MANIFEST_NAME
 
 def load_metadata():
     """metadata.json 로드"""
@@ -19,8 +46,32 @@ def load_metadata():
             return json.load(f)
     return {}
 
-def index_papers():
+def index_papers(
+    full: bool = False,
+    workers: int = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    use_cache: bool = True,
+    embed_workers: int = 1,
+    threads_per_worker: int = None,
+    benchmark: int = 0,
+    seed: int = 0,
+    report_path: Path = None,
+    use_dedup: bool = True,
+):
     print("=== PDF 인덱싱 시작 ===")
+    stats = IngestStats()
+    chroma_dir = CHROMA_DIR
+    manifest_file = MANIFEST_FILE
+    sample = None
+    if benchmark:
+        # 벤치마크: PDF 일부만 임시 DB에 새로 인덱싱 (실제 DB/manifest는 건드리지 않음)
+        sample = sample_pdfs(PDF_DIR, benchmark, seed)
+        chroma_dir = Path(tempfile.mkdtemp(prefix="indexer_bench_"))
+        manifest_file = chroma_dir / MANIFEST_NAME
+        full = True
+        # 파싱 텍스트 / 임베딩 캐시를 거치면 캐시 읽기 시간을 재게 되고 실제 캐시에 샘플 결과가 쌓이므로 끔
+        use_cache = False
+        print(f"[Benchmark] PDF {len(sample)}개 샘플, 임시 DB: {chroma_dir}")
     
     # 1. 메타데이터 로드
     metadata = load_metadata()
@@ -31,90 +82,257 @@ def index_papers():
     for pid, paper in metadata.items():
         filename_to_meta[paper['pdf_filename']] = paper
     
-    # 2. PDF 로드
-    print(f"PDF 로드 중... ({PDF_DIR})")
-    loader = PyPDFDirectoryLoader(str(PDF_DIR))
-    documents = loader.load()
-    print(f"로드된 문서: {len(documents)}개")
-    
-    # 3. 문서에 메타데이터 추가
-    for doc in documents:
-        filename = Path(doc.metadata.get('source', '')).name
-        if filename in filename_to_meta:
-            paper = filename_to_meta[filename]
-            doc.metadata['title'] = paper.get('title', 'Unknown')
-            doc.metadata['year'] = paper.get('year', 'Unknown')
-            doc.metadata['citationCount'] = paper.get('citationCount', 0)
-            doc.metadata['authors'] = paper.get('authors', '')
-            doc.metadata['paperId'] = paper.get('paperId', '')
-    
-    # 4. 텍스트 분할
-    print("텍스트 분할 중...")
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=100,
-        separators=["\n\n", "\n", ". ", " ", ""]
-    )
-    chunks = splitter.split_documents(documents)
-    print(f"생성된 청크: {len(chunks)}개")
-    
-    # 5. 임베딩 모델 로드
-    print("임베딩 모델 로드 중...")
-    embedder = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-    )
-    
-    # 6. ChromaDB 초기화
-    print(f"ChromaDB 초기화... ({CHROMA_DIR})")
-    CHROMA_DIR.mkdir(parents=True, exist_ok=True)
-    client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+    # 2. ChromaDB 초기화
+    print(f"ChromaDB 초기화... ({chroma_dir})")
+    chroma_dir.mkdir(parents=True, exist_ok=True)
+    client = chromadb.PersistentClient(path=str(chroma_dir))
     
-    # 기존 컬렉션 삭제 후 새로 생성
-    try:
-        client.delete_collection("papers")
-    except:
-        pass
+    # 3. 변경된 PDF 확인 (manifest의 해시와 비교)
+    # metadata_version: 저장하는 메타데이터 형식이 바뀌면 올림 (2: year를 int로 저장)
+    config = {
+        "model": MODEL_NAME,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "dedup": use_dedup,
+        "metadata_version": 2,
+    }
+    manifest = load_manifest(manifest_file)
+    # 전체 재구축 때 memmap 저장소에서 지울 예전 PDF들 (manifest를 비우기 전에 기록)
+    indexed_files = list(manifest["files"])
+    if full or manifest["config"] != config:
+        # 전체 재구축: 기존 컬렉션 삭제 후 새로 생성
+        try:
+            client.delete_collection("papers")
+        except:
+            pass
+        manifest = {"version": manifest["version"], "config": config, "files": {}}
     
-    collection = client.create_collection(
+    collection = client.get_or_create_collection(
         name="papers",
         metadata={"hnsw:space": "cosine"}
     )
+    # 하이브리드 검색용 BM25 역색인 (컬렉션과 같은 폴더)
+    bm25 = BM25Index(chroma_dir / BM25_FILE)
+    if collection.count() == 0:
+        manifest["files"] = {}
+        bm25.clear()
+    # VECTOR_BACKEND=memmap이면 앱이 읽는 메모리 맵 저장소에도 같은 쓰기 / 삭제를 반영
+    mirror = get_memmap_mirror(chroma_dir, collection)
     
-    # 7. 임베딩 및 저장
-    print("임베딩 및 저장 중...")
-    batch_size = 100
+    files = scan_pdfs(PDF_DIR, manifest["files"], names=sample)
+    changed, removed, unchanged = plan_changes(manifest["files"], files)
     
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i+batch_size]
+    # 중복 검사 기록 갱신: 원본이 바뀌거나 지워진 중복 PDF도 다시 인덱싱
+    dedup = Deduplicator(chroma_dir) if use_dedup else None
+    if dedup is not None:
+        if not manifest["files"]:
+            dedup.reset()
+        dependents = [f for f in dedup.dependents_of(removed + changed) if f in files and f not in changed]
+        changed = changed + dependents
+        unchanged = [f for f in unchanged if f not in dependents]
+        dedup.forget(removed + changed)
+    print(f"PDF: 신규/변경 {len(changed)}개, 삭제 {len(removed)}개, 유지 {len(unchanged)}개")
+    
+    # 삭제되었거나 바뀐 PDF의 기존 청크 제거 (중간에 죽은 실행이 남긴 청크 포함)
+    if collection.count() > 0:
+        for filename in removed + changed:
+            collection.delete(where={"source": str(PDF_DIR / filename)})
+        bm25.delete_sources([str(PDF_DIR / filename) for filename in removed + changed])
+    if mirror is not None:
+        # PDF에서 온 행만 지움 (memmap에만 있는 rag_index / memory_write 행은 남김)
+        stale = set(removed + changed) | (set(indexed_files) if not manifest["files"] else set())
+        if stale:
+            mirror.delete(where={"source": {"$in": [str(PDF_DIR / filename) for filename in sorted(stale)]}})
+    
+    # 4. 파싱 → 분할 → 임베딩 → 저장을 스트리밍으로 처리
+    #    (단계마다 별도 스레드, 단계 사이 버퍼 크기 제한 → 코퍼스 크기와 무관하게 메모리 일정)
+    failed = []
+    total = 0
+    if changed:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            separators=["\n\n", "\n", ". ", " ", ""],
+            add_start_index=True
+        )
+        
+        print("임베딩 모델 로드 중...")
+        if embed_workers > 1:
+            # 워커 프로세스마다 모델 복사본을 두고 청크를 나눠서 임베딩
+            pool = EmbeddingPool(MODEL_NAME, embed_workers, threads_per_worker)
+            encode = pool.encode
+            candidates = [size * embed_workers for size in DEFAULT_CANDIDATES]
+            # 모델은 워커에만 있으므로 길이 계산용 토크나이저만 로드
+            length_fn = token_length_fn(load_tokenizer(MODEL_NAME))
+        else:
+            pool = None
+            embedder = HuggingFaceEmbeddings(model_name=MODEL_NAME)
+            encode = sentence_transformer_encoder(embedder.client)
+            candidates = DEFAULT_CANDIDATES
+            length_fn = token_length_fn(embedder.client.tokenizer, embedder.client.max_seq_length)
+        # 텍스트가 그대로인 청크는 디스크 캐시의 벡터 재사용
+        cache = EmbeddingCache(MODEL_NAME) if use_cache else None
+        
+        def split_stage(parsed):
+            # 파일 단위로 메타데이터 추가 후 청크 생성
+            for path, documents, error in stats.timed_iter("parse", parsed):
+                if error:
+                    print(f"[PDF 파싱 실패] {Path(path).name}: {error}")
+                    failed.append(Path(path).name)
+                    continue
+                
+                paper = filename_to_meta.get(Path(path).name)
+                if paper:
+                    for doc in documents:
+                        doc.metadata['title'] = paper.get('title', 'Unknown')
+                        doc.metadata['year'] = paper.get('year')
+                        doc.metadata['citationCount'] = paper.get('citationCount', 0)
+                        doc.metadata['authors'] = paper.get('authors', '')
+                        doc.metadata['paperId'] = paper.get('paperId', '')
+                
+                stats.add("files")
+                stats.add("pages", len(documents))
+                
+                # 이미 인덱싱된 논문과 거의 같은 PDF는 건너뜀
+                if dedup is not None:
+                    with stats.stage("dedup"):
+                        canonical = dedup.check_paper(Path(path).name, "\n".join(d.page_content for d in documents))
+                    if canonical:
+                        continue
+                
+                with stats.stage("split"):
+                    chunks = splitter.split_documents(documents)
+                    assign_chunk_ids(chunks)
+                
+                # 이미 저장된 청크와 거의 같은 청크는 제외
+                if dedup is not None:
+                    with stats.stage("dedup"):
+                        chunks = dedup.filter_chunks(Path(path).name, chunks)
+                yield from chunks
         
-        texts = [chunk.page_content for chunk in batch]
-        embeddings = embedder.embed_documents(texts)
+        # 토큰 길이순 버킷 + 배치 크기 자동 튜닝
+        bucketed = BucketedEmbedder(encode, candidates=candidates, length_fn=length_fn)
         
-        ids = [f"chunk_{i+j}" for j in range(len(batch))]
-        metadatas = []
-        for chunk in batch:
-            metadatas.append({
-                'title': str(chunk.metadata.get('title', 'Unknown')),
-                'year': str(chunk.metadata.get('year', 'Unknown')),
-                'citationCount': int(chunk.metadata.get('citationCount', 0)),
-                'authors': str(chunk.metadata.get('authors', '')),
-                'paperId': str(chunk.metadata.get('paperId', '')),
-                'source': str(chunk.metadata.get('source', ''))
-            })
+        def embed_stage(chunks):
+            # 윈도우 단위로 모아서 길이순으로 임베딩하고, 저장은 원래 순서대로 100개씩
+            for window in batched(chunks, DEFAULT_WINDOW):
+                window_texts = [chunk.page_content for chunk in window]
+                with stats.stage("embed"):
+                    if cache is not None:
+                        window_embeddings = cache.embed(window_texts, bucketed)
+                    else:
+                        window_embeddings = bucketed(window_texts)
+                for i in range(0, len(window), 100):
+                    yield window[i:i+100], window_texts[i:i+100], window_embeddings[i:i+100]
         
-        collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=metadatas
+        print(f"PDF 로드 및 임베딩 중... ({PDF_DIR})")
+        # 예전에 파싱한 적 있는 PDF(같은 해시)는 캐시된 텍스트에서 바로 분할
+        parsed = parse_with_cache(
+            [PDF_DIR / f for f in changed],
+            [files[f]["sha256"] for f in changed],
+            ParsedTextCache() if use_cache else None,
+            workers=workers,
+            timeout=timeout,
         )
         
-        print(f"진행: {min(i+batch_size, len(chunks))}/{len(chunks)}")
+        try:
+            for batch, texts, embeddings in run_stages(parsed, [split_stage, embed_stage]):
+                ids = [chunk.metadata['chunk_id'] for chunk in batch]
+                metadatas = []
+                for chunk in batch:
+                    metadatas.append({
+                        'title': str(chunk.metadata.get('title', 'Unknown')),
+                        'citationCount': int(chunk.metadata.get('citationCount') or 0),
+                        'authors': str(chunk.metadata.get('authors', '')),
+                        'paperId': str(chunk.metadata.get('paperId', '')),
+                        'source': str(chunk.metadata.get('source', ''))
+                    })
+                    # 연도는 숫자로 저장 (rag_search의 연도 범위 필터), 모르면 생략
+                    year = chunk.metadata.get('year')
+                    if isinstance(year, int) or (isinstance(year, str) and year.isdigit()):
+                        metadatas[-1]['year'] = int(year)
+                
+                with stats.stage("write"):
+                    collection.upsert(
+                        ids=ids,
+                        embeddings=embeddings,
+                        documents=texts,
+                        metadatas=metadatas
+                    )
+                    if mirror is not None:
+                        mirror.upsert(ids, documents=texts, metadatas=metadatas, embeddings=embeddings)
+                with stats.stage("bm25"):
+                    bm25.upsert(ids, texts, [m['title'] for m in metadatas], [m['source'] for m in metadatas])
+                
+                stats.add("chunks", len(batch))
+                total += len(batch)
+                print(f"진행: {total}개 청크 저장")
+        finally:
+            if pool is not None:
+                pool.close()
+        
+        if cache is not None:
+            print(f"임베딩 캐시: hit {cache.hits}개, miss {cache.misses}개")
+        embed_report = bucketed.report()
+        print(f"임베딩 처리량 (같은 샘플): 기존 {embed_report['baseline_chunks_per_sec']} chunks/s → "
+              f"버킷 {embed_report['sample_bucketed_chunks_per_sec']} chunks/s (배치 {embed_report['batch_size']}), "
+              f"전체 {embed_report['bucketed_chunks_per_sec']} chunks/s (튜닝 {embed_report['tuning_seconds']}초 포함)")
+    
+    # 5. manifest 갱신 (저장이 끝난 뒤에 기록)
+    # 파싱에 실패한 PDF는 기록하지 않음 → 다음 실행에서 다시 시도
+    manifest["files"] = {name: entry for name, entry in files.items() if name not in failed}
+    save_manifest(manifest_file, manifest)
+    if dedup is not None:
+        dedup.save()
+    if changed or removed:
+        # 검색 결과 캐시 무효화
+        bump_version(chroma_dir)
     
     print(f"\n=== 인덱싱 완료 ===")
     print(f"총 {collection.count()}개 청크 저장됨")
-    print(f"DB 경로: {CHROMA_DIR}")
+    print(f"DB 경로: {chroma_dir}")
+    
+    # 6. 단계별 시간 / 처리량 리포트
+    extra = {"entry_point": "data/indexer.py", "sample": benchmark or None, "failed": failed}
+    if dedup is not None:
+        extra["dedup"] = {"skipped_papers": dedup.skipped_papers, "skipped_chunks": dedup.skipped_chunks}
+        print(f"중복 제거: 논문 {dedup.skipped_papers}개, 청크 {dedup.skipped_chunks}개")
+    if changed:
+        extra["embedding"] = embed_report
+        if cache is not None:
+            extra["embedding_cache"] = {"hits": cache.hits, "misses": cache.misses}
+    report = stats.report(extra)
+    print(f"처리량: {report['pages_per_sec']} pages/s, {report['chunks_per_sec']} chunks/s, "
+          f"단계별 {report['stage_seconds']}")
+    if benchmark:
+        report_path = report_path or Path("indexer_benchmark.json")
+        shutil.rmtree(chroma_dir, ignore_errors=True)
+    if report_path:
+        write_report(report_path, report)
 
 
 if __name__ == "__main__":
-    index_papers()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="data/ 폴더의 PDF를 ChromaDB에 인덱싱")
+    parser.add_argument("--full", action="store_true", help="변경 여부와 상관없이 전체 재구축")
+    parser.add_argument("--workers", type=int, default=None, help="PDF 파싱 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="PDF 하나당 파싱 제한 시간 (초)")
+    parser.add_argument("--no-cache", action="store_true", help="파싱/임베딩 캐시 사용 안 함")
+    parser.add_argument("--embed-workers", type=int, default=1, help="임베딩 워커 프로세스 수 (1이면 현재 프로세스)")
+    parser.add_argument("--threads-per-worker", type=int, default=None, help="임베딩 워커당 torch 스레드 수 (기본: CPU 수 / 워커 수)")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="N", help="PDF N개 샘플로 임시 DB에 인덱싱하고 리포트 작성")
+    parser.add_argument("--seed", type=int, default=0, help="벤치마크 샘플 seed")
+    parser.add_argument("--report", type=Path, default=None, help="JSON 리포트 저장 경로")
+    parser.add_argument("--no-dedup", action="store_true", help="중복 논문/청크 제거 안 함")
+    args = parser.parse_args()
+    index_papers(
+        full=args.full,
+        workers=args.workers,
+        timeout=args.timeout,
+        use_cache=not args.no_cache,
+        embed_workers=args.embed_workers,
+        threads_per_worker=args.threads_per_worker,
+        benchmark=args.benchmark,
+        seed=args.seed,
+        report_path=args.report,
+        use_dedup=not args.no_dedup,
+    )
@@ -9,20 +9,34 @@ from tools.tool_definitions import (
     rag_search_handler, RAGSearchInput,
     semantic_scholar_search_handler, SemanticScholarSearchInput
 )
+from tools.chroma_client import get_rag_collection
+from tools.title_index import get_title_index
 
 class PaperAnalysisNodes:
     """논문 분석 노드들"""
     
     def rag_node(self, state: AgentState) -> dict:
         print(f"[PAPER_ANALYSIS RAG] query: {state['query']}")
-        result = rag_search_handler(RAGSearchInput(query=state["query"], top_k=3))
-        print(f"[PAPER_ANALYSIS RAG] count: {result.get('count')}")
         
-        if result.get("count", 0) == 0:
-            print("[PAPER_ANALYSIS RAG] → not found")
-            return {"rag_result": {"found": False}, "status": "not_found"}
-        
-        target = result.get("results", [])[0]
+        # 제목으로 바로 찾기 (임베딩 / 리랭킹 / API 호출 없음)
+        match = get_title_index().lookup(state["query"])
+        if match:
+            target = match["paper"]
+            print(f"[PAPER_ANALYSIS RAG] 제목 {match['match']} 일치 ({match['score']}): {target.get('title')}")
+            if not target.get("abstract") and target.get("source"):
+                # 메타데이터 없는 PDF: 첫 청크를 초록 대신 사용
+                first = get_rag_collection().get(where={"source": target["source"]}, limit=1)
+                if first["documents"]:
+                    target["abstract"] = first["documents"][0]
+        else:
+            result = rag_search_handler(RAGSearchInput(query=state["query"], top_k=3))
+            print(f"[PAPER_ANALYSIS RAG] count: {result.get('count')}")
+            
+            if result.get("count", 0) == 0:
+                print("[PAPER_ANALYSIS RAG] → not found")
+                return {"rag_result": {"found": False}, "status": "not_found"}
+            
+            target = result.get("results", [])[0]
         print(f"[PAPER_ANALYSIS RAG] → found: {target.get('title')}")
         return {
             "rag_result": {"found": True},
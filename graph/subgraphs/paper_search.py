@@ -15,33 +15,7 @@ from tools.tool_definitions import (
     semantic_scholar_search_handler, SemanticScholarSearchInput
 )
 from tools.reranker import rerank_results
-
-
-def extract_title_from_filename(filename: str) -> str:
-    """
-    파일명에서 실제 논문 제목 추출
-    예: 2021_Artificial_intelligence_in_education__Ad_c0a8fe3a 
-    → Artificial intelligence in education
-    """
-    import re
-    
-    # .pdf 제거
-    name = filename.replace(".pdf", "")
-    
-    # 연도 제거 (앞의 4자리 숫자_)
-    parts = name.split("_", 1)
-    if len(parts) == 2 and parts[0].isdigit() and len(parts[0]) == 4:
-        name = parts[1]
-    
-    # 마지막 ID 제거 (8자리 16진수)
-    # 패턴: _로 시작하고 8자리 16진수로 끝남
-    # 예: __Ad_c0a8fe3a, _c3df199c
-    name = re.sub(r'_+[a-fA-F0-9]{8}$', '', name)
-    
-    # 언더스코어를 공백으로 변경
-    title = name.replace("_", " ")
-    
-    return title.strip()
+from tools.title_index import extract_title_from_filename
 
 
 def find_paper_url_via_semantic_scholar(title: str) -> str:
@@ -6,7 +6,7 @@ sys.path.insert(0, str(TRANSPOTER_ROOT))
 
 from graph.state import AgentState
 from tools.tool_definitions import (
-    rag_search_handler, RAGSearchInput,
+    rag_multi_search_handler, RAGMultiSearchInput,
     memory_read_handler, MemoryReadInput
 )
 
@@ -26,12 +26,13 @@ class RecommendationNodes:
     
     def recommend_node(self, state: AgentState) -> dict:
         interests = state.get("user_interests", ["AI research"])
-        query = " ".join(interests[:3])
         
-        result = rag_search_handler(RAGSearchInput(query=query, top_k=5))
+        # 관심사마다 따로 검색 (임베딩 / 벡터 검색은 한 번) 후 RRF로 합침
+        result = rag_multi_search_handler(RAGMultiSearchInput(queries=interests, top_k=5))
         recommendations = result.get("results", [])
 
         if not recommendations:
+            query = " ".join(interests[:3])
             from tools.tool_definitions import semantic_scholar_search_handler, SemanticScholarSearchInput
             api_result = semantic_scholar_search_handler(
                 SemanticScholarSearchInput(query=query, limit=5)
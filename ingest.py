@@ -1,68 +1,302 @@
+import json
+import shutil
+import tempfile
+import argparse
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFDirectoryLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import chromadb
 from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
-import uuid
 import logging
+from ingestion.manifest import MANIFEST_NAME, load_manifest, save_manifest, scan_pdfs, plan_changes
+from ingestion.parser import DEFAULT_TIMEOUT
+from ingestion.text_cache import ParsedTextCache, parse_with_cache
+from ingestion.pipeline import run_stages, batched
+from ingestion.embedding_cache import EmbeddingCache
+from ingestion.chunk_ids import assign_chunk_ids
+from ingestion.batching import (
+    DEFAULT_WINDOW, DEFAULT_CANDIDATES, BucketedEmbedder, sentence_transformer_encoder, load_tokenizer, token_length_fn,
+)
+from ingestion.embed_pool import EmbeddingPool
+from ingestion.benchmark import IngestStats, sample_pdfs, write_report
+from ingestion.dedup import Deduplicator
+from tools.bm25_index import BM25_FILE, BM25Index
+from tools.collection_version import bump_version
+from tools.chroma_client import get_memmap_mirror
 logging.getLogger("pypdf").setLevel(logging.ERROR)
 
+MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+MAX_PAGE_CHARS = 1500
+METADATA_FILE = Path(__file__).resolve().parent / "data" / "metadata.json"
 
-def main():
+
+def main(
+    full: bool = False,
+    workers: int = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    use_cache: bool = True,
+    embed_workers: int = 1,
+    threads_per_worker: int = None,
+    benchmark: int = 0,
+    seed: int = 0,
+    report_path: Path = None,
+    use_dedup: bool = True,
+):
     BASE_DIR = Path(__file__).resolve().parent
     PDF_DIR = BASE_DIR / "data"
     DB_PATH = BASE_DIR / "chroma_db"
+    stats = IngestStats()
+    sample = None
+    if benchmark:
+        # 벤치마크: PDF 일부만 임시 DB에 새로 인덱싱 (실제 DB/manifest는 건드리지 않음)
+        sample = sample_pdfs(PDF_DIR, benchmark, seed)
+        DB_PATH = Path(tempfile.mkdtemp(prefix="ingest_bench_"))
+        full = True
+        # 파싱 텍스트 / 임베딩 캐시를 거치면 캐시 읽기 시간을 재게 되고 실제 캐시에 샘플 결과가 쌓이므로 끔
+        use_cache = False
+        print(f"[Benchmark] PDF {len(sample)}개 샘플, 임시 DB: {DB_PATH}")
+    MANIFEST_FILE = DB_PATH / MANIFEST_NAME
     
-    # PDF 로드
-    loader = PyPDFDirectoryLoader(str(PDF_DIR))
-    documents = loader.load()
-    print(f"로드된 문서: {len(documents)}개")
-    
-    # 1500자 자르기
-    for doc in documents:
-        doc.page_content = doc.page_content[:1500]
-    
-    # 청킹
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = splitter.split_documents(documents)
-    print(f"생성된 청크: {len(chunks)}개")
+    # PDF 파일명 -> 논문 메타데이터 (연도 / 인용 수 필터용)
+    papers_by_file = {}
+    if METADATA_FILE.exists():
+        with open(METADATA_FILE, "r", encoding="utf-8") as f:
+            papers_by_file = {p["pdf_filename"]: p for p in json.load(f).values() if p.get("pdf_filename")}
     
     # ChromaDB 네이티브 방식
     embedding_fn = SentenceTransformerEmbeddingFunction(
-        model_name="paraphrase-multilingual-MiniLM-L12-v2"
+        model_name=MODEL_NAME
     )
     
     client = chromadb.PersistentClient(path=str(DB_PATH))
     
-    # 기존 컬렉션 삭제 후 재생성
-    try:
-        client.delete_collection("papers")
-    except:
-        pass
+    # 변경된 PDF 확인 (manifest의 해시와 비교)
+    # metadata_version: 저장하는 메타데이터 형식이 바뀌면 올림 (2: year / citationCount / paperId 추가)
+    config = {
+        "model": MODEL_NAME,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "max_page_chars": MAX_PAGE_CHARS,
+        "dedup": use_dedup,
+        "metadata_version": 2,
+    }
+    manifest = load_manifest(MANIFEST_FILE)
+    # 전체 재구축 때 memmap 저장소에서 지울 예전 PDF들 (manifest를 비우기 전에 기록)
+    indexed_files = list(manifest["files"])
+    if full or manifest["config"] != config:
+        # 전체 재구축: 기존 컬렉션 삭제 후 재생성
+        try:
+            client.delete_collection("papers")
+        except:
+            pass
+        manifest = {"version": manifest["version"], "config": config, "files": {}}
     
     collection = client.get_or_create_collection(
         name="papers",
         embedding_function=embedding_fn
     )
+    # 하이브리드 검색용 BM25 역색인 (컬렉션과 같은 폴더)
+    bm25 = BM25Index(DB_PATH / BM25_FILE)
+    if collection.count() == 0:
+        manifest["files"] = {}
+        bm25.clear()
+    # VECTOR_BACKEND=memmap이면 앱이 읽는 메모리 맵 저장소에도 같은 쓰기 / 삭제를 반영
+    mirror = get_memmap_mirror(DB_PATH, collection)
+    
+    files = scan_pdfs(PDF_DIR, manifest["files"], names=sample)
+    changed, removed, unchanged = plan_changes(manifest["files"], files)
+    
+    # 중복 검사 기록 갱신: 원본이 바뀌거나 지워진 중복 PDF도 다시 인덱싱
+    dedup = Deduplicator(DB_PATH) if use_dedup else None
+    if dedup is not None:
+        if not manifest["files"]:
+            dedup.reset()
+        dependents = [f for f in dedup.dependents_of(removed + changed) if f in files and f not in changed]
+        changed = changed + dependents
+        unchanged = [f for f in unchanged if f not in dependents]
+        dedup.forget(removed + changed)
+    print(f"PDF: 신규/변경 {len(changed)}개, 삭제 {len(removed)}개, 유지 {len(unchanged)}개")
+    
+    # 삭제되었거나 바뀐 PDF의 기존 청크 제거 (중간에 죽은 실행이 남긴 청크 포함)
+    if collection.count() > 0:
+        for filename in removed + changed:
+            collection.delete(where={"source": str(PDF_DIR / filename)})
+        bm25.delete_sources([str(PDF_DIR / filename) for filename in removed + changed])
+    if mirror is not None:
+        # PDF에서 온 행만 지움 (memmap에만 있는 rag_index / memory_write 행은 남김)
+        stale = set(removed + changed) | (set(indexed_files) if not manifest["files"] else set())
+        if stale:
+            mirror.delete(where={"source": {"$in": [str(PDF_DIR / filename) for filename in sorted(stale)]}})
+    
+    # 파싱 → 자르기/청킹 → 임베딩 → 저장을 스트리밍으로 처리
+    # (단계마다 별도 스레드, 단계 사이 버퍼 크기 제한 → 메모리 일정)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True
+    )
+    # 텍스트가 그대로인 청크는 디스크 캐시의 벡터 재사용
+    cache = EmbeddingCache(MODEL_NAME) if use_cache else None
+    failed = []
+    
+    def split_stage(parsed):
+        for path, documents, error in stats.timed_iter("parse", parsed):
+            if error:
+                print(f"[PDF 파싱 실패] {Path(path).name}: {error}")
+                failed.append(Path(path).name)
+                continue
+            
+            # 1500자 자르기
+            for doc in documents:
+                doc.page_content = doc.page_content[:MAX_PAGE_CHARS]
+            
+            stats.add("files")
+            stats.add("pages", len(documents))
+            
+            # 이미 인덱싱된 논문과 거의 같은 PDF는 건너뜀
+            if dedup is not None:
+                with stats.stage("dedup"):
+                    canonical = dedup.check_paper(Path(path).name, "\n".join(d.page_content for d in documents))
+                if canonical:
+                    continue
+            
+            with stats.stage("split"):
+                chunks = splitter.split_documents(documents)
+                assign_chunk_ids(chunks)
+            
+            # 이미 저장된 청크와 거의 같은 청크는 제외
+            if dedup is not None:
+                with stats.stage("dedup"):
+                    chunks = dedup.filter_chunks(Path(path).name, chunks)
+            yield from chunks
     
-    # 배치로 저장 (100개씩)
-    batch_size = 100
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i+batch_size]
-        
-        ids = [str(uuid.uuid4()) for _ in batch]
-        docs = [c.page_content for c in batch]
-        metas = [{
-            "title": c.metadata.get("source", "").split("/")[-1].replace(".pdf", ""),
-            "source": c.metadata.get("source", ""),
-            "page": c.metadata.get("page", 0)
-        } for c in batch]
-        
-        collection.add(ids=ids, documents=docs, metadatas=metas)
-        print(f"진행: {min(i+batch_size, len(chunks))}/{len(chunks)}")
+    if embed_workers > 1 and changed:
+        # 워커 프로세스마다 모델 복사본을 두고 청크를 나눠서 임베딩
+        pool = EmbeddingPool(MODEL_NAME, embed_workers, threads_per_worker)
+        encode = pool.encode
+        candidates = [size * embed_workers for size in DEFAULT_CANDIDATES]
+        # 모델은 워커에만 있으므로 길이 계산용 토크나이저만 로드
+        length_fn = token_length_fn(load_tokenizer(MODEL_NAME))
+    else:
+        pool = None
+        encode = sentence_transformer_encoder(embedding_fn._model)  # _model = SentenceTransformer
+        candidates = DEFAULT_CANDIDATES
+        length_fn = token_length_fn(embedding_fn._model.tokenizer, embedding_fn._model.max_seq_length)
+    
+    # 토큰 길이순 버킷 + 배치 크기 자동 튜닝
+    bucketed = BucketedEmbedder(encode, candidates=candidates, length_fn=length_fn)
+    
+    def embed_stage(chunks):
+        # 윈도우 단위로 길이순 임베딩, 저장은 원래 순서대로 배치 (100개씩)
+        for window in batched(chunks, DEFAULT_WINDOW):
+            window_docs = [c.page_content for c in window]
+            with stats.stage("embed"):
+                if cache is not None:
+                    window_embeddings = cache.embed(window_docs, bucketed)
+                else:
+                    window_embeddings = bucketed(window_docs)
+            for i in range(0, len(window), 100):
+                yield window[i:i+100], window_docs[i:i+100], window_embeddings[i:i+100]
+    
+    # 예전에 파싱한 적 있는 PDF(같은 해시)는 캐시된 텍스트에서 바로 분할
+    parsed = parse_with_cache(
+        [PDF_DIR / f for f in changed],
+        [files[f]["sha256"] for f in changed],
+        ParsedTextCache() if use_cache else None,
+        workers=workers,
+        timeout=timeout,
+    )
+    total = 0
+    try:
+        for batch, docs, embeddings in run_stages(parsed, [split_stage, embed_stage]):
+            ids = [c.metadata["chunk_id"] for c in batch]
+            metas = [{
+                "title": c.metadata.get("source", "").split("/")[-1].replace(".pdf", ""),
+                "source": c.metadata.get("source", ""),
+                "page": c.metadata.get("page", 0)
+            } for c in batch]
+            for meta in metas:
+                paper = papers_by_file.get(Path(meta["source"]).name)
+                if not paper:
+                    continue
+                meta["citationCount"] = int(paper.get("citationCount") or 0)
+                meta["paperId"] = str(paper.get("paperId") or "")
+                meta["authors"] = str(paper.get("authors") or "")
+                # 연도를 모르면 넣지 않음 (year 필터에 걸리지 않도록)
+                year = paper.get("year")
+                if isinstance(year, int) or (isinstance(year, str) and year.isdigit()):
+                    meta["year"] = int(year)
+            
+            with stats.stage("write"):
+                collection.upsert(ids=ids, embeddings=embeddings, documents=docs, metadatas=metas)
+                if mirror is not None:
+                    mirror.upsert(ids, documents=docs, metadatas=metas, embeddings=embeddings)
+            with stats.stage("bm25"):
+                bm25.upsert(ids, docs, [m["title"] for m in metas], [m["source"] for m in metas])
+            stats.add("chunks", len(batch))
+            total += len(batch)
+            print(f"진행: {total}개 청크 저장")
+    finally:
+        if pool is not None:
+            pool.close()
+    
+    if cache is not None:
+        print(f"임베딩 캐시: hit {cache.hits}개, miss {cache.misses}개")
+    embed_report = bucketed.report()
+    print(f"임베딩 처리량 (같은 샘플): 기존 {embed_report['baseline_chunks_per_sec']} chunks/s → "
+          f"버킷 {embed_report['sample_bucketed_chunks_per_sec']} chunks/s (배치 {embed_report['batch_size']}), "
+          f"전체 {embed_report['bucketed_chunks_per_sec']} chunks/s (튜닝 {embed_report['tuning_seconds']}초 포함)")
+    
+    # manifest 갱신 (저장이 끝난 뒤에 기록)
+    # 파싱에 실패한 PDF는 기록하지 않음 → 다음 실행에서 다시 시도
+    manifest["files"] = {name: entry for name, entry in files.items() if name not in failed}
+    save_manifest(MANIFEST_FILE, manifest)
+    if dedup is not None:
+        dedup.save()
+    if changed or removed:
+        # 검색 결과 캐시 무효화
+        bump_version(DB_PATH)
     
     print(f"인덱싱 완료: {collection.count()}개")
+    
+    # 단계별 시간 / 처리량 리포트
+    extra = {"entry_point": "ingest.py", "sample": benchmark or None, "failed": failed, "embedding": embed_report}
+    if dedup is not None:
+        extra["dedup"] = {"skipped_papers": dedup.skipped_papers, "skipped_chunks": dedup.skipped_chunks}
+        print(f"중복 제거: 논문 {dedup.skipped_papers}개, 청크 {dedup.skipped_chunks}개")
+    if cache is not None:
+        extra["embedding_cache"] = {"hits": cache.hits, "misses": cache.misses}
+    report = stats.report(extra)
+    print(f"처리량: {report['pages_per_sec']} pages/s, {report['chunks_per_sec']} chunks/s, "
+          f"단계별 {report['stage_seconds']}")
+    if benchmark:
+        report_path = report_path or Path("ingest_benchmark.json")
+        shutil.rmtree(DB_PATH, ignore_errors=True)
+    if report_path:
+        write_report(report_path, report)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="data/ 폴더의 PDF를 ChromaDB에 인덱싱")
+    parser.add_argument("--full", action="store_true", help="변경 여부와 상관없이 전체 재구축")
+    parser.add_argument("--workers", type=int, default=None, help="PDF 파싱 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="PDF 하나당 파싱 제한 시간 (초)")
+    parser.add_argument("--no-cache", action="store_true", help="파싱/임베딩 캐시 사용 안 함")
+    parser.add_argument("--embed-workers", type=int, default=1, help="임베딩 워커 프로세스 수 (1이면 현재 프로세스)")
+    parser.add_argument("--threads-per-worker", type=int, default=None, help="임베딩 워커당 torch 스레드 수 (기본: CPU 수 / 워커 수)")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="N", help="PDF N개 샘플로 임시 DB에 인덱싱하고 리포트 작성")
+    parser.add_argument("--seed", type=int, default=0, help="벤치마크 샘플 seed")
+    parser.add_argument("--report", type=Path, default=None, help="JSON 리포트 저장 경로")
+    parser.add_argument("--no-dedup", action="store_true", help="중복 논문/청크 제거 안 함")
+    args = parser.parse_args()
+    main(
+        full=args.full,
+        workers=args.workers,
+        timeout=args.timeout,
+        use_cache=not args.no_cache,
+        embed_workers=args.embed_workers,
+        threads_per_worker=args.threads_per_worker,
+        benchmark=args.benchmark,
+        seed=args.seed,
+        report_path=args.report,
+        use_dedup=not args.no_dedup,
+    )
@@ -0,0 +1,172 @@
+import time
+import random
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 한 번에 정렬해서 버킷으로 나눌 청크 수
+DEFAULT_WINDOW = 1024
+# 자동 튜닝 후보 배치 크기
+DEFAULT_CANDIDATES = (16, 32, 64, 128, 256)
+# 기존 방식 (파일 순서 그대로 100개씩, encode 기본 배치 32)
+LEGACY_BATCH = 100
+LEGACY_ENCODE_BATCH = 32
+# 측정 전에 한 번 돌리는 텍스트 수 (첫 encode의 커널 / 메모리 할당 시간을 비교에서 뺌)
+WARMUP_TEXTS = 8
+
+
+def sentence_transformer_encoder(model) -> Callable[[List[str], int], np.ndarray]:
+    """
+    SentenceTransformer 모델을 (texts, batch_size) -> 벡터 함수로 감쌈
+    """
+    def encode(texts: List[str], batch_size: int) -> np.ndarray:
+        return model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    return encode
+
+
+def load_tokenizer(model_name: str):
+    """
+    임베딩 모델의 토크나이저만 로드 (워커 프로세스로 임베딩할 때 메인 프로세스에서 길이 계산용)
+    """
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(model_name if "/" in model_name else f"sentence-transformers/{model_name}")
+
+
+def token_length_fn(tokenizer, max_length: Optional[int] = None) -> Callable[[str], int]:
+    """
+    텍스트 → 토큰 수 (패딩은 토큰 단위로 생기므로 글자 수 대신 버킷 기준으로 사용)
+    max_length: 모델이 자르는 길이 (넘는 텍스트는 모두 같은 길이로 봄)
+    """
+    def length(text: str) -> int:
+        ids = tokenizer(text, add_special_tokens=False, truncation=max_length is not None, max_length=max_length)["input_ids"]
+        return len(ids)
+    return length
+
+
+class BucketedEmbedder:
+    """
+    길이(length_fn, 보통 토큰 수)순으로 정렬해서 비슷한 길이끼리 배치를 만들고 (패딩 최소화)
+    첫 윈도우의 가운데 길이 구간(band) 하나를 후보 배치 크기마다 똑같이 인코딩해서 가장 빠른 크기를 고름
+    (후보마다 다른 길이 구간을 재면 배치 크기와 길이 효과가 섞임, 후보 순서는 라운드마다 섞음)
+    결과는 입력 순서대로 돌려줌
+
+    처리량 비교: 워밍업 뒤 첫 윈도우 앞 LEGACY_BATCH개를 기존 방식 / 버킷 방식으로 각각 인코딩 (같은 샘플)
+    버킷 방식 전체 처리량에는 튜닝에 쓴 시간도 포함
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str], int], Sequence],
+        candidates: Sequence[int] = DEFAULT_CANDIDATES,
+        rounds: int = 2,
+        length_fn: Callable[[str], int] = len,
+    ):
+        self.encode = encode
+        self.length_fn = length_fn
+        self.candidates = list(candidates)
+        self.rounds = rounds
+        self._measured: Dict[int, List[float]] = {}
+        self.batch_size: Optional[int] = None
+
+        self.baseline = {"chunks": 0, "seconds": 0.0}
+        self.sample = {"chunks": 0, "seconds": 0.0}
+        self.tuned = {"chunks": 0, "seconds": 0.0}
+        self.tuning_seconds = 0.0
+
+    def _tune(self, texts: List[str], band: List[int]) -> List:
+        """
+        같은 band를 후보 배치 크기마다 인코딩해서 처리량 비교 → batch_size 고정
+        Returns: band의 벡터 (마지막 측정 결과)
+        """
+        batch = [texts[i] for i in band]
+        rng = random.Random(0)
+        out = None
+        for _ in range(self.rounds):
+            sizes = list(self.candidates)
+            rng.shuffle(sizes)
+            for size in sizes:
+                t0 = time.perf_counter()
+                out = [v for s in range(0, len(batch), size) for v in self.encode(batch[s:s + size], size)]
+                elapsed = time.perf_counter() - t0
+                self._measured.setdefault(size, []).append(elapsed)
+                self.tuning_seconds += elapsed
+        # 같은 텍스트이므로 시간이 가장 짧은 크기 (band 벡터는 결과로 쓰고, 튜닝 시간은 전체 처리량에 포함)
+        self.batch_size = min(self._measured, key=lambda s: sum(self._measured[s]) / len(self._measured[s]))
+        self.tuned["chunks"] += len(batch)
+        print(f"[Embedding] 배치 크기 자동 선택: {self.batch_size}")
+        return out
+
+    def _encode_sorted(self, texts: List[str]) -> float:
+        """
+        길이순 + batch_size로 인코딩하는 데 걸린 시간 (결과는 버림, 샘플 비교용)
+        """
+        ordered = sorted(texts, key=self.length_fn)
+        t0 = time.perf_counter()
+        for s in range(0, len(ordered), self.batch_size):
+            self.encode(ordered[s:s + self.batch_size], self.batch_size)
+        return time.perf_counter() - t0
+
+    def __call__(self, texts: Sequence[str]) -> List[List[float]]:
+        texts = list(texts)
+        vectors: List = [None] * len(texts)
+        start = 0
+
+        # 첫 호출: 워밍업 후 앞부분을 기존 방식 그대로 돌려서 비교 기준으로 사용
+        compare = self.baseline["chunks"] == 0 and len(texts) >= LEGACY_BATCH
+        if compare:
+            self.encode(texts[:WARMUP_TEXTS], WARMUP_TEXTS)
+            t0 = time.perf_counter()
+            legacy = self.encode(texts[:LEGACY_BATCH], LEGACY_ENCODE_BATCH)
+            self.baseline["seconds"] += time.perf_counter() - t0
+            self.baseline["chunks"] += LEGACY_BATCH
+            vectors[:LEGACY_BATCH] = list(legacy)
+            start = LEGACY_BATCH
+
+        # 길이순 정렬 후 배치 크기만큼 잘라서 인코딩
+        order = sorted(range(start, len(texts)), key=lambda i: self.length_fn(texts[i]))
+        if self.batch_size is None and order:
+            # 가운데 길이 구간에서 가장 큰 후보 크기만큼
+            width = max(self.candidates)
+            lo = max(0, len(order) // 2 - width // 2)
+            band = order[lo:lo + width]
+            for i, vector in zip(band, self._tune(texts, band)):
+                vectors[i] = vector
+            order = order[:lo] + order[lo + width:]
+        if compare and self.batch_size is not None:
+            # 같은 샘플을 버킷 방식으로 한 번 더 (기존 방식과 1:1 비교)
+            self.sample["seconds"] += self._encode_sorted(texts[:LEGACY_BATCH])
+            self.sample["chunks"] += LEGACY_BATCH
+        pos = 0
+        while pos < len(order):
+            size = self.batch_size
+            idx = order[pos:pos + size]
+            batch = [texts[i] for i in idx]
+
+            t0 = time.perf_counter()
+            out = self.encode(batch, len(batch))
+            elapsed = time.perf_counter() - t0
+            self.tuned["seconds"] += elapsed
+            self.tuned["chunks"] += len(batch)
+
+            for i, vector in zip(idx, out):
+                vectors[i] = vector
+            pos += size
+        return [np.asarray(v, dtype=np.float32).tolist() for v in vectors]
+
+    def report(self) -> Dict[str, float]:
+        """
+        처리량 (chunks/sec)
+          baseline: 기존 방식 (워밍업 뒤 샘플), sample_bucketed: 같은 샘플을 버킷 방식으로
+          bucketed: 버킷 방식으로 처리한 전체 청크 (배치 크기 튜닝 시간 포함)
+        """
+        def rate(chunks, seconds):
+            return round(chunks / seconds, 1) if seconds else None
+
+        return {
+            "baseline_chunks_per_sec": rate(self.baseline["chunks"], self.baseline["seconds"]),
+            "sample_bucketed_chunks_per_sec": rate(self.sample["chunks"], self.sample["seconds"]),
+            "bucketed_chunks_per_sec": rate(self.tuned["chunks"], self.tuned["seconds"] + self.tuning_seconds),
+            "batch_size": self.batch_size,
+            "tuning_seconds": round(self.tuning_seconds, 3),
+        }
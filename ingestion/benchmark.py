@@ -0,0 +1,112 @@
+import sys
+import json
+import time
+import random
+import resource
+from pathlib import Path
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+def sample_pdfs(pdf_dir: Path, n: int, seed: int = 0) -> List[str]:
+    """
+    data/*.pdf 중 n개를 무작위로 고른 파일명 리스트 (seed가 같으면 항상 같은 샘플)
+    """
+    names = sorted(p.name for p in Path(pdf_dir).glob("*.pdf") if not p.name.startswith("."))
+    if n >= len(names):
+        return names
+    return sorted(random.Random(seed).sample(names, n))
+
+
+def _peak_rss_mb(who: int) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+
+class IngestStats:
+    """
+    인덱싱 단계별 소요 시간 / 처리량 / 메모리 기록
+
+    단계들이 동시에 실행되므로 stage 시간은 각 단계가 실제로 일한 시간의 합
+    (parse는 분할 단계가 다음 PDF를 기다린 시간)
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.write_latencies: List[float] = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.seconds[name] += elapsed
+            if name == "write":
+                self.write_latencies.append(elapsed)
+
+    def timed_iter(self, name: str, items: Iterable) -> Iterator:
+        """
+        items에서 다음 항목을 꺼내는 데 걸린 시간을 name 단계로 기록
+        """
+        iterator = iter(items)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def add(self, name: str, n: int = 1) -> None:
+        self.counts[name] += n
+
+    def report(self, extra: Dict[str, Any] = None) -> Dict[str, Any]:
+        wall = time.perf_counter() - self._start
+        latencies_ms = [s * 1000 for s in self.write_latencies]
+        report = {
+            "wall_seconds": round(wall, 3),
+            "files": self.counts["files"],
+            "pages": self.counts["pages"],
+            "chunks": self.counts["chunks"],
+            "pages_per_sec": round(self.counts["pages"] / wall, 2) if wall else None,
+            "chunks_per_sec": round(self.counts["chunks"] / wall, 2) if wall else None,
+            "stage_seconds": {k: round(v, 3) for k, v in self.seconds.items()},
+            "write_latency_ms": {
+                "count": len(latencies_ms),
+                "mean": round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else None,
+                "p50": _percentile(latencies_ms, 0.5),
+                "p95": _percentile(latencies_ms, 0.95),
+                "max": round(max(latencies_ms), 2) if latencies_ms else None,
+            },
+            # 파싱/임베딩 워커 프로세스는 children에 잡힘
+            "peak_rss_mb": {
+                "self": _peak_rss_mb(resource.RUSAGE_SELF),
+                "children": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+            },
+        }
+        if extra:
+            report.update(extra)
+        return report
+
+
+def write_report(path: Path, report: Dict[str, Any]) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[Benchmark] 리포트 저장: {path}")
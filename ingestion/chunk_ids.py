@@ -0,0 +1,41 @@
+from pathlib import Path
+from typing import List
+
+
+def doc_key(metadata: dict) -> str:
+    """
+    청크 ID의 앞부분: paperId가 있으면 paperId, 없으면 PDF 파일명
+    """
+    paper_id = metadata.get("paperId")
+    if paper_id:
+        return str(paper_id)
+    return Path(metadata.get("source", "")).stem
+
+
+def chunk_id(key: str, page: int, start_index: int) -> str:
+    """
+    논문 / 페이지 / 페이지 안 시작 위치로 만든 고정 청크 ID
+    같은 PDF를 다시 인덱싱하면 같은 ID가 나오므로 upsert 가능
+    """
+    return f"{key}:p{page}:c{start_index}"
+
+
+def assign_chunk_ids(chunks: List) -> List[str]:
+    """
+    한 PDF에서 나온 청크들의 ID를 만들어 metadata['chunk_id']에 넣고 반환
+    (splitter에 add_start_index=True 필요)
+    """
+    ids = []
+    seen = {}
+    for chunk in chunks:
+        meta = chunk.metadata
+        cid = chunk_id(doc_key(meta), int(meta.get("page", 0)), int(meta.get("start_index", 0)))
+        # 시작 위치를 못 찾은 청크(-1) 등이 겹치면 순번을 붙여 구분
+        if cid in seen:
+            seen[cid] += 1
+            cid = f"{cid}:{seen[cid]}"
+        else:
+            seen[cid] = 0
+        meta["chunk_id"] = cid
+        ids.append(cid)
+    return ids
@@ -0,0 +1,203 @@
+import re
+import json
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# MinHash 설정: 64개 해시를 8개 밴드 x 8행으로 나눔 → 유사도 약 0.77부터 후보로 잡힘
+NUM_PERM = 64
+BANDS = 8
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+
+_PRIME = np.uint64(4294967311)  # 2^32보다 큰 소수
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, 2 ** 32 - 1, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 2 ** 32 - 1, size=NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+
+def minhash(text: str, k: int = SHINGLE_SIZE) -> Optional[np.ndarray]:
+    """
+    단어 k-gram 집합의 MinHash 시그니처 (단어가 너무 적으면 None)
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        return None
+    shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    # crc32: 프로세스가 달라도 같은 값 (시그니처를 파일로 저장하므로)
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    시그니처 일치 비율 = Jaccard 유사도 추정값
+    """
+    return float(np.mean(a == b))
+
+
+class LSHIndex:
+    """
+    MinHash 시그니처의 LSH 인덱스 (key마다 owner(PDF 파일명)를 같이 기록)
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.owners: Dict[str, str] = {}
+        self._buckets: Dict[Tuple[int, bytes], set] = {}
+
+    def _bands(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        rows = NUM_PERM // BANDS
+        for band in range(BANDS):
+            yield band, signature[band * rows:(band + 1) * rows].tobytes()
+
+    def add(self, key: str, signature: np.ndarray, owner: str) -> None:
+        self.signatures[key] = signature
+        self.owners[key] = owner
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, set()).add(key)
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[str, float]]:
+        """
+        threshold 이상으로 가장 비슷한 key와 유사도 (없으면 None)
+        """
+        candidates = set()
+        for band in self._bands(signature):
+            candidates |= self._buckets.get(band, set())
+        best = None
+        for key in candidates:
+            score = similarity(signature, self.signatures[key])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def remove_owners(self, owners: Iterable[str]) -> None:
+        owners = set(owners)
+        for key in [k for k, o in self.owners.items() if o in owners]:
+            signature = self.signatures.pop(key)
+            del self.owners[key]
+            for band in self._bands(signature):
+                self._buckets.get(band, set()).discard(key)
+
+    def save(self, path: Path) -> None:
+        keys = list(self.signatures)
+        np.savez_compressed(
+            path,
+            keys=np.array(keys, dtype=object),
+            owners=np.array([self.owners[k] for k in keys], dtype=object),
+            signatures=np.stack([self.signatures[k] for k in keys]) if keys else np.zeros((0, NUM_PERM), dtype=np.uint64),
+        )
+
+    @classmethod
+    def load(cls, path: Path, threshold: float = DEFAULT_THRESHOLD) -> "LSHIndex":
+        index = cls(threshold)
+        if Path(path).exists():
+            data = np.load(path, allow_pickle=True)
+            for key, owner, signature in zip(data["keys"], data["owners"], data["signatures"]):
+                index.add(str(key), signature, str(owner))
+        return index
+
+
+class Deduplicator:
+    """
+    인덱싱 중 거의 같은 논문 / 청크를 걸러냄
+
+    - 논문: 전체 텍스트가 이미 인덱싱된 PDF와 거의 같으면 청크를 저장하지 않음
+    - 청크: 이미 저장된 청크와 거의 같으면 저장하지 않음
+    어떤 것이 원본(canonical)인지는 <db>/dedup.json에 기록
+    """
+
+    def __init__(self, db_dir: Path, threshold: float = DEFAULT_THRESHOLD):
+        self.db_dir = Path(db_dir)
+        self._map_path = self.db_dir / "dedup.json"
+        self._papers_path = self.db_dir / "dedup_papers.npz"
+        self._chunks_path = self.db_dir / "dedup_chunks.npz"
+
+        self.papers = LSHIndex.load(self._papers_path, threshold)
+        self.chunks = LSHIndex.load(self._chunks_path, threshold)
+        self.canonical = {"papers": {}, "chunks": {}}
+        if self._map_path.exists():
+            with open(self._map_path, "r", encoding="utf-8") as f:
+                self.canonical = json.load(f)
+        self.skipped_papers = 0
+        self.skipped_chunks = 0
+
+    def reset(self) -> None:
+        self.papers = LSHIndex(self.papers.threshold)
+        self.chunks = LSHIndex(self.chunks.threshold)
+        self.canonical = {"papers": {}, "chunks": {}}
+
+    def dependents_of(self, filenames: Iterable[str]) -> List[str]:
+        """
+        filenames의 논문/청크를 원본으로 가리키는 다른 PDF 목록
+        (원본이 바뀌거나 지워지면 이 PDF들도 다시 인덱싱해야 함)
+        """
+        filenames = set(filenames)
+        dependents = {dup for dup, canon in self.canonical["papers"].items() if canon in filenames}
+        for entry in self.canonical["chunks"].values():
+            if self.chunks.owners.get(entry["canonical"]) in filenames:
+                dependents.add(entry["file"])
+        return sorted(dependents - filenames)
+
+    def forget(self, filenames: Iterable[str]) -> None:
+        """
+        삭제되거나 다시 인덱싱할 PDF의 기록 제거
+        """
+        filenames = set(filenames)
+        self.papers.remove_owners(filenames)
+        self.chunks.remove_owners(filenames)
+        self.canonical["papers"] = {
+            dup: canon for dup, canon in self.canonical["papers"].items()
+            if dup not in filenames and canon not in filenames
+        }
+        self.canonical["chunks"] = {
+            dup: entry for dup, entry in self.canonical["chunks"].items()
+            if entry["file"] not in filenames and entry["canonical"] in self.chunks.signatures
+        }
+
+    def check_paper(self, filename: str, text: str) -> Optional[str]:
+        """
+        중복이면 원본 PDF 파일명 반환, 아니면 인덱스에 등록하고 None
+        """
+        signature = minhash(text)
+        if signature is None:
+            return None
+        match = self.papers.query(signature)
+        if match and match[0] != filename:
+            self.canonical["papers"][filename] = match[0]
+            self.skipped_papers += 1
+            print(f"[Dedup] 중복 논문: {filename} → {match[0]} (유사도 {match[1]:.2f})")
+            return match[0]
+        self.papers.add(filename, signature, filename)
+        return None
+
+    def filter_chunks(self, filename: str, chunks: List) -> List:
+        """
+        이미 저장된 청크와 거의 같은 청크를 제외한 리스트 (metadata['chunk_id'] 필요)
+        """
+        kept = []
+        for chunk in chunks:
+            chunk_id = chunk.metadata["chunk_id"]
+            signature = minhash(chunk.page_content)
+            if signature is None:
+                kept.append(chunk)
+                continue
+            match = self.chunks.query(signature)
+            if match and match[0] != chunk_id:
+                self.canonical["chunks"][chunk_id] = {"canonical": match[0], "file": filename}
+                self.skipped_chunks += 1
+                continue
+            self.chunks.add(chunk_id, signature, filename)
+            kept.append(chunk)
+        return kept
+
+    def save(self) -> None:
+        self.db_dir.mkdir(parents=True, exist_ok=True)
+        self.papers.save(self._papers_path)
+        self.chunks.save(self._chunks_path)
+        with open(self._map_path, "w", encoding="utf-8") as f:
+            json.dump(self.canonical, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,64 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+# 워커 프로세스마다 하나씩 가지는 모델
+_model = None
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    global _model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_shard(texts: List[str], batch_size: int) -> np.ndarray:
+    return _model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+
+
+class EmbeddingPool:
+    """
+    대량 인덱싱용 임베딩 워커 풀
+
+    워커마다 모델을 따로 로드하므로 메모리는 workers배로 늘고,
+    threads_per_worker로 워커 하나가 쓰는 torch 스레드 수를 조절
+    """
+
+    def __init__(self, model_name: str, workers: int, threads_per_worker: Optional[int] = None):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        # torch가 초기화된 프로세스를 fork하면 멈출 수 있어서 spawn 사용
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, self.threads_per_worker),
+        )
+        print(f"[EmbeddingPool] 워커 {workers}개 x 스레드 {self.threads_per_worker}개")
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        texts를 워커 수만큼 연속 구간으로 나눠 병렬 인코딩 후 입력 순서대로 합침
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        shard_size = -(-len(texts) // self.workers)
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+        per_worker_batch = max(1, batch_size // self.workers)
+        futures = [self._executor.submit(_encode_shard, shard, per_worker_batch) for shard in shards]
+        return np.concatenate([f.result() for f in futures])
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
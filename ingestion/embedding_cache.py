@@ -0,0 +1,182 @@
+import json
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 두 인덱싱 스크립트가 같이 쓰는 기본 캐시 위치 (컬렉션을 지워도 남음)
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "embeddings"
+
+
+def text_key(text: str) -> str:
+    """
+    청크 텍스트의 해시 (캐시 키)
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    모델별 디스크 임베딩 캐시
+
+    <cache_dir>/<model>/
+        meta.json     모델 이름, 차원
+        vectors.f32   float32 벡터를 이어 붙인 파일 (memmap으로 읽음)
+        index.tsv     "텍스트 해시<TAB>행 번호" (append only)
+        lock          프로세스 간 잠금용 빈 파일
+
+    같은 캐시를 여러 인덱싱 프로세스가 같이 써도 됨: 추가할 때는 lock 파일에 배타 flock을 잡고
+    다른 프로세스가 그 사이에 붙인 행 / 인덱스 줄을 먼저 따라 읽은 뒤 벡터 + 인덱스를 append
+    """
+
+    def __init__(self, model_name: str, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.model_name = model_name
+        self.dir = Path(cache_dir) / model_name.replace("/", "__")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._meta_path = self.dir / "meta.json"
+        self._vectors_path = self.dir / "vectors.f32"
+        self._index_path = self.dir / "index.tsv"
+
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._n_rows = 0
+        # index.tsv에서 이미 읽은 바이트 수 (다른 프로세스가 붙인 줄만 이어서 읽음)
+        self._index_offset = 0
+        self._mmap = None
+        self._lock = threading.Lock()
+        self._lock_file = open(self.dir / "lock", "a+b")
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True):
+        """
+        프로세스 간 잠금 (lock 파일에 flock, self._lock 안에서만 호출)
+        """
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        # 잘린 행 / 줄을 정리할 수 있도록 배타 잠금
+        with self._lock, self._file_lock():
+            self._sync(repair=True)
+
+    def _sync(self, repair: bool = False) -> None:
+        """
+        다른 프로세스가 그 사이에 추가한 행 / 인덱스 줄을 따라 읽음 (파일 잠금 안에서 호출)
+        repair=True면 (배타 잠금일 때만) 쓰는 도중에 죽은 프로세스가 남긴 잘린 행 / 줄을 잘라냄
+        """
+        if self.dim is None:
+            if not self._meta_path.exists():
+                return
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+
+        # 쓰는 도중에 죽었으면 잘린 마지막 행은 버리고, 벡터보다 앞선 인덱스 줄은 무시
+        n_rows = 0
+        if self._vectors_path.exists():
+            row_bytes = 4 * self.dim
+            size = self._vectors_path.stat().st_size
+            n_rows = size // row_bytes
+            if repair and size % row_bytes:
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(n_rows * row_bytes)
+        if self._index_path.exists():
+            with open(self._index_path, "rb") as f:
+                f.seek(self._index_offset)
+                tail = f.read()
+            end = tail.rfind(b"\n") + 1
+            if repair and end < len(tail):
+                # 줄바꿈 없이 끝난 줄 → 다음 append가 그 뒤에 이어 붙지 않도록 잘라냄
+                with open(self._index_path, "r+b") as f:
+                    f.truncate(self._index_offset + end)
+            for line in tail[:end].decode("utf-8").splitlines():
+                parts = line.split("\t")
+                if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < n_rows:
+                    self._rows[parts[0]] = int(parts[1])
+            self._index_offset += end
+        self._n_rows = n_rows
+
+    def _matrix(self) -> np.ndarray:
+        # 파일이 커졌으면 memmap을 다시 연다
+        if self._mmap is None or self._mmap.shape[0] < self._n_rows:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r").reshape(-1, self.dim)
+        return self._mmap
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        캐시된 벡터 반환 (없으면 None)
+        """
+        keys = [text_key(t) for t in texts]
+        with self._lock:
+            # 다른 프로세스가 먼저 계산해 둔 벡터도 씀 (쓰는 중인 프로세스가 없을 때 읽도록 공유 잠금)
+            with self._file_lock(exclusive=False):
+                self._sync()
+            if not self._rows:
+                return [None] * len(texts)
+            matrix = self._matrix()
+            return [matrix[self._rows[k]].tolist() if k in self._rows else None for k in keys]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence) -> None:
+        """
+        새 벡터 추가 (이미 있는 텍스트는 건너뜀)
+        """
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            # 행 번호는 다른 프로세스가 그 사이에 붙인 행 뒤부터
+            self._sync(repair=True)
+            if self.dim is None:
+                self.dim = int(array.shape[1])
+                self._n_rows = 0
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f)
+
+            new_keys, new_rows = {}, []
+            for text, row in zip(texts, array):
+                key = text_key(text)
+                if key in self._rows or key in new_keys:
+                    continue
+                new_keys[key] = self._n_rows + len(new_rows)
+                new_rows.append(row)
+            if not new_keys:
+                return
+
+            # 벡터를 먼저 쓰고 인덱스를 나중에 씀
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.stack(new_rows).tobytes())
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                for key, row in new_keys.items():
+                    f.write(f"{key}\t{row}\n")
+            self._rows.update(new_keys)
+            self._n_rows += len(new_rows)
+            self._index_offset = self._index_path.stat().st_size
+
+    def embed(self, texts: Sequence[str], embed_fn: Callable[[List[str]], Sequence]) -> List[List[float]]:
+        """
+        캐시에 없는 텍스트만 embed_fn으로 계산하고, 입력 순서대로 벡터 반환
+        """
+        vectors = self.get_many(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = np.asarray(embed_fn(missing_texts), dtype=np.float32)
+            self.put_many(missing_texts, computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector.tolist()
+        return vectors
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+# 인덱싱된 PDF의 해시 목록 (DB 폴더 안에 같이 저장)
+MANIFEST_NAME = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """
+    파일 내용의 SHA-256 해시 반환
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    """
+    manifest 로드 (없거나 깨졌으면 빈 manifest)
+    """
+    empty = {"version": MANIFEST_VERSION, "config": {}, "files": {}}
+    if not path.exists():
+        return empty
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return empty
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty
+    manifest.setdefault("config", {})
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def save_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    """
+    manifest 저장 (임시 파일에 쓰고 교체 → 중간에 죽어도 깨지지 않음)
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def scan_pdfs(
+    pdf_dir: Path,
+    previous: Dict[str, Dict[str, Any]] = None,
+    names: List[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    PDF 폴더를 스캔해서 파일명 -> {sha256, size, mtime_ns} 반환
+    크기와 수정 시각이 이전과 같으면 해시를 다시 계산하지 않음
+    names를 주면 그 파일들만 스캔 (벤치마크 샘플 등)
+    """
+    previous = previous or {}
+    files = {}
+    for path in sorted(pdf_dir.glob("*.pdf")):
+        if path.name.startswith("."):
+            continue
+        if names is not None and path.name not in names:
+            continue
+        stat = path.stat()
+        old = previous.get(path.name)
+        if old and old.get("size") == stat.st_size and old.get("mtime_ns") == stat.st_mtime_ns:
+            sha256 = old["sha256"]
+        else:
+            sha256 = file_sha256(path)
+        files[path.name] = {
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+    return files
+
+
+def plan_changes(
+    old_files: Dict[str, Dict[str, Any]],
+    new_files: Dict[str, Dict[str, Any]],
+) -> Tuple[List[str], List[str], List[str]]:
+    """
+    이전/현재 스캔 결과 비교
+
+    Returns:
+        (새로 추가되거나 바뀐 파일, 삭제된 파일, 그대로인 파일) 파일명 리스트
+    """
+    changed, unchanged = [], []
+    for name, entry in new_files.items():
+        old = old_files.get(name)
+        if old and old.get("sha256") == entry["sha256"]:
+            unchanged.append(name)
+        else:
+            changed.append(name)
+    removed = sorted(name for name in old_files if name not in new_files)
+    return changed, removed, unchanged
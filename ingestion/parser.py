@@ -0,0 +1,150 @@
+import os
+import signal
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# 파일 하나당 파싱 제한 시간 (초)
+DEFAULT_TIMEOUT = 120
+
+
+class ParseTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise ParseTimeout()
+
+
+def _parse_pdf(path: str, timeout: Optional[int] = None) -> list:
+    """
+    PDF 하나를 페이지 단위 Document 리스트로 파싱 (워커 프로세스에서 실행)
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+    # 순수 파이썬 파싱이 멈춘 경우 워커 안에서 먼저 끊음 (Unix, 메인 스레드에서만 가능)
+    use_alarm = timeout and hasattr(signal, "SIGALRM") and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(timeout)
+    try:
+        return PyPDFLoader(path).load()
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    # 파이프라인 스레드에서 torch / chromadb / 모델이 이미 올라간 프로세스를 fork하면 멈출 수 있어서 spawn 사용
+    # (embed_pool.py와 같음)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _kill_pool(executor: ProcessPoolExecutor) -> None:
+    """
+    응답 없는 워커가 있는 풀을 강제로 정리
+    """
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    # 회수(join)해야 벤치마크의 RUSAGE_CHILDREN peak RSS에 잡힘
+    for process in processes:
+        process.join()
+
+
+def parse_pdfs(
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+) -> Iterator[Tuple[str, List, Optional[str]]]:
+    """
+    PDF들을 프로세스 풀에서 병렬로 파싱
+
+    Args:
+        paths: PDF 경로 리스트
+        workers: 프로세스 수 (None이면 CPU 수, 1이면 현재 프로세스에서 순차 처리
+                 - 단 메인 스레드가 아니면 alarm을 쓸 수 없으므로 프로세스 1개짜리 풀)
+        timeout: 파일 하나당 제한 시간 (초)
+
+    Yields:
+        (경로, 페이지 Document 리스트, 에러 메시지 또는 None)
+        입력 순서 그대로 나오므로 순차 처리와 결과가 같음
+    """
+    paths = [str(p) for p in paths]
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1 and threading.current_thread() is threading.main_thread():
+        for path in paths:
+            try:
+                yield path, _parse_pdf(path, timeout), None
+            except ParseTimeout:
+                yield path, [], f"timeout ({timeout}s)"
+            except Exception as e:
+                yield path, [], f"{type(e).__name__}: {e}"
+        return
+
+    # 실행 중인 작업을 워커 수로 제한 → 제출 시각 기준으로 제한 시간 측정 가능
+    # 워커 안의 alarm이 못 끊는 경우(C 확장 등)를 위해 부모 쪽 제한은 2배로 둠
+    hard_timeout = timeout * 2 if timeout else None
+    pending = list(paths)
+    # 워커가 죽었을 때 같이 실행 중이던 파일들 → 범인을 가리기 위해 하나씩 단독 실행
+    isolated = set()
+    executor = _new_pool(workers)
+    in_flight = []
+    try:
+        while pending or in_flight:
+            while pending and len(in_flight) < workers:
+                if in_flight and (pending[0] in isolated or any(p in isolated for p, _ in in_flight)):
+                    break
+                path = pending.pop(0)
+                try:
+                    future = executor.submit(_parse_pdf, path, timeout)
+                except BrokenProcessPool:
+                    # 실행 중이던 작업이 방금 워커를 죽임 → 다시 넣고 아래 result()에서 처리
+                    pending.insert(0, path)
+                    if not in_flight:
+                        _kill_pool(executor)
+                        executor = _new_pool(workers)
+                        continue
+                    break
+                in_flight.append((path, future))
+
+            path, future = in_flight.pop(0)
+            try:
+                yield path, future.result(timeout=hard_timeout), None
+            except (FutureTimeoutError, BrokenProcessPool) as e:
+                # 멈추거나 죽은 워커는 되살릴 수 없으니 풀을 새로 만들고 나머지는 다시 제출
+                print(f"[Parser] 워커 재시작: {path}")
+                _kill_pool(executor)
+                executor = _new_pool(workers)
+                if isinstance(e, FutureTimeoutError):
+                    pending = [p for p, _ in in_flight] + pending
+                    in_flight = []
+                    yield path, [], f"timeout ({hard_timeout}s)"
+                elif path in isolated and not in_flight:
+                    # 단독으로 실행했는데도 죽음 → 이 파일 때문
+                    yield path, [], "worker crashed"
+                else:
+                    # BrokenProcessPool은 실행 중이던 작업 전부를 실패시키므로 누가 원인인지 모름
+                    suspects = [path] + [p for p, _ in in_flight]
+                    isolated.update(suspects)
+                    pending = suspects + pending
+                    in_flight = []
+            except ParseTimeout:
+                yield path, [], f"timeout ({timeout}s)"
+            except Exception as e:
+                yield path, [], f"{type(e).__name__}: {e}"
+    finally:
+        if pending or in_flight:
+            # 소비자가 중간에 멈춤 (제너레이터를 닫거나 예외) → 남은 작업은 기다리지 않음
+            _kill_pool(executor)
+        else:
+            # 워커를 join까지 해야 RUSAGE_CHILDREN에 워커 peak RSS가 잡힘 (벤치마크 리포트)
+            executor.shutdown(wait=True)
@@ -0,0 +1,101 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Sequence
+
+# 단계 사이 큐에 쌓아둘 수 있는 최대 항목 수 (메모리 상한)
+DEFAULT_BUFFER_SIZE = 4
+
+_DONE = object()
+
+
+class _Failure:
+    """앞 단계에서 난 예외를 뒤 단계로 넘기기 위한 래퍼"""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(q: queue.Queue, stop: threading.Event) -> Iterator:
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.exc
+        yield item
+
+
+def _run(make_iter: Callable[[], Iterable], outbox: queue.Queue, stop: threading.Event) -> None:
+    items = None
+    try:
+        items = iter(make_iter())
+        for item in items:
+            if not _put(outbox, item, stop):
+                return
+        _put(outbox, _DONE, stop)
+    except BaseException as e:
+        _put(outbox, _Failure(e), stop)
+    finally:
+        # 중간에 멈춘 경우에도 제너레이터 정리 코드(풀 종료 등)가 바로 실행되도록
+        if hasattr(items, "close"):
+            items.close()
+
+
+def run_stages(
+    source: Iterable,
+    stages: Sequence[Callable[[Iterator], Iterable]],
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> Iterator:
+    """
+    source → stage1 → stage2 → ... 를 각각 별도 스레드에서 동시에 실행
+
+    각 stage는 이터레이터를 받아 이터러블을 돌려주는 함수
+    (하나를 받아 여러 개를 내보내거나, 여러 개를 모아 배치로 내보낼 수 있음)
+    단계 사이는 크기가 제한된 큐로 연결되어 앞 단계가 너무 앞서가지 않음
+
+    Yields:
+        마지막 stage의 출력 (호출한 스레드에서 소비)
+    """
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=buffer_size) for _ in range(len(stages) + 1)]
+
+    threads = [threading.Thread(target=_run, args=(lambda: source, queues[0], stop), daemon=True)]
+    for i, stage in enumerate(stages):
+        make_iter = lambda stage=stage, inbox=queues[i]: stage(_drain(inbox, stop))
+        threads.append(threading.Thread(target=_run, args=(make_iter, queues[i + 1], stop), daemon=True))
+
+    for thread in threads:
+        thread.start()
+    try:
+        yield from _drain(queues[-1], stop)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=1)
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    """
+    이터러블을 size개씩 묶어서 반환 (마지막 배치는 더 작을 수 있음)
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,106 @@
+import os
+import gzip
+import json
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from .parser import DEFAULT_TIMEOUT, parse_pdfs
+
+# PDF 해시별 추출 텍스트 저장 위치 (청킹 설정을 바꿔도 재사용)
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "parsed"
+
+
+class ParsedTextCache:
+    """
+    PDF 해시 -> 페이지별 텍스트/메타데이터 (gzip JSONL, 한 줄 = 한 페이지)
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, sha256: str) -> Path:
+        return self.dir / f"{sha256}.jsonl.gz"
+
+    def has(self, sha256: str) -> bool:
+        return self.path_for(sha256).exists()
+
+    def get(self, sha256: str, source: str) -> Optional[List[Document]]:
+        """
+        캐시된 페이지 Document 리스트 (source는 현재 경로로 바꿔서 반환)
+        """
+        path = self.path_for(sha256)
+        if not path.exists():
+            return None
+        documents = []
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    page = json.loads(line)
+                    metadata = page["metadata"]
+                    metadata["source"] = source
+                    documents.append(Document(page_content=page["page_content"], metadata=metadata))
+        except (OSError, EOFError, json.JSONDecodeError, KeyError):
+            # 깨진 항목은 지워서 다음 실행부터는 일반 캐시 미스로 처리
+            path.unlink(missing_ok=True)
+            return None
+        return documents
+
+    def put(self, sha256: str, documents: Sequence[Document]) -> None:
+        path = self.path_for(sha256)
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=5) as f:
+            for doc in documents:
+                f.write(json.dumps(
+                    {"page_content": doc.page_content, "metadata": doc.metadata},
+                    ensure_ascii=False,
+                    default=str,
+                ))
+                f.write("\n")
+        os.replace(tmp_path, path)
+
+
+def parse_with_cache(
+    paths: Sequence[str],
+    hashes: Sequence[str],
+    cache: Optional[ParsedTextCache],
+    workers: Optional[int] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+) -> Iterator[Tuple[str, List[Document], Optional[str]]]:
+    """
+    parse_pdfs와 같은 출력, 단 캐시에 있는 PDF는 파싱하지 않고 캐시에서 읽음
+    (입력 순서 유지)
+    """
+    paths = [str(p) for p in paths]
+    if cache is None:
+        yield from parse_pdfs(paths, workers=workers, timeout=timeout)
+        return
+
+    to_parse = [p for p, h in zip(paths, hashes) if not cache.has(h)]
+    pending = set(to_parse)
+    parsed = parse_pdfs(to_parse, workers=workers, timeout=timeout) if to_parse else iter(())
+    try:
+        for path, sha256 in zip(paths, hashes):
+            documents = cache.get(sha256, path) if path not in pending else None
+            if documents is not None:
+                cache.hits += 1
+                yield path, documents, None
+                continue
+
+            if path in pending:
+                _, documents, error = next(parsed)
+            else:
+                # 캐시 파일이 깨진 경우: 이 파일만 따로 파싱
+                # (파이프라인 스레드에서 호출되므로 parse_pdfs가 프로세스 1개짜리 풀에서 제한 시간과 함께 처리)
+                _, documents, error = next(parse_pdfs([path], workers=1, timeout=timeout))
+            cache.misses += 1
+            if not error:
+                cache.put(sha256, documents)
+            yield path, documents, error
+    finally:
+        if hasattr(parsed, "close"):
+            parsed.close()
@@ -0,0 +1,129 @@
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+# Chroma DB 폴더 안에 같이 저장되는 역색인 파일
+BM25_FILE = "bm25.sqlite3"
+
+_TERM = re.compile(r"\w[\w\-\.]*\w|\w")
+
+
+def build_match_query(query: str) -> str:
+    """
+    사용자 질의 → FTS5 MATCH 식 (단어마다 따옴표로 감싸서 OR)
+    'WGAN-GP' 같은 약어는 "wgan-gp" 구(phrase)가 되어 WGAN-GP / WGAN GP 모두 매칭
+    """
+    terms = []
+    for term in _TERM.findall(query):
+        term = term.replace('"', "")
+        if term and term.lower() not in terms:
+            terms.append(term.lower())
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+class BM25Index:
+    """
+    SQLite FTS5 기반 BM25 역색인 (청크 ID / 출처 / 제목 / 본문)
+
+    FTS5의 UNINDEXED 컬럼은 검색할 때마다 전체를 훑으므로
+    청크 ID / 출처 → FTS rowid는 일반 테이블(chunk_rows)에 따로 두고 rowid로 삭제
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        # clear() 직후 (전체 재구축 중) → 기존 행이 없으므로 ID별 삭제를 건너뜀
+        self._fresh = False
+        with self._lock:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+                "id UNINDEXED, source UNINDEXED, title, body, tokenize='unicode61 remove_diacritics 2')"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_rows (id TEXT PRIMARY KEY, fts_rowid INTEGER NOT NULL, source TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunk_rows_source ON chunk_rows (source)")
+            # chunk_rows가 생기기 전에 만든 역색인이면 한 번 채움
+            if self._conn.execute("SELECT 1 FROM chunk_rows LIMIT 1").fetchone() is None:
+                self._conn.execute("INSERT OR REPLACE INTO chunk_rows (id, fts_rowid, source) SELECT id, rowid, source FROM chunks")
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+
+    def _delete_rowids(self, rowids: Sequence[int]) -> None:
+        self._conn.executemany("DELETE FROM chunks WHERE rowid = ?", [(r,) for r in rowids])
+
+    def upsert(self, ids: Sequence[str], texts: Sequence[str], titles: Sequence[str], sources: Sequence[str]) -> None:
+        # 같은 배치 안에 같은 ID가 여러 번 있으면 마지막 것만
+        latest = {doc_id: i for i, doc_id in enumerate(ids)}
+        rows = [(ids[i], sources[i], titles[i], texts[i]) for i in sorted(latest.values())]
+        with self._lock:
+            if not self._fresh:
+                existing = []
+                for start in range(0, len(rows), 500):
+                    batch = [row[0] for row in rows[start:start + 500]]
+                    existing.extend(r[0] for r in self._conn.execute(
+                        f"SELECT fts_rowid FROM chunk_rows WHERE id IN ({','.join('?' * len(batch))})", batch
+                    ))
+                self._delete_rowids(existing)
+            for doc_id, source, title, body in rows:
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks (id, source, title, body) VALUES (?, ?, ?, ?)", (doc_id, source, title, body)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO chunk_rows (id, fts_rowid, source) VALUES (?, ?, ?)",
+                    (doc_id, cursor.lastrowid, source),
+                )
+            self._conn.commit()
+
+    def delete_sources(self, sources: Sequence[str]) -> None:
+        with self._lock:
+            for source in sources:
+                rowids = [r[0] for r in self._conn.execute("SELECT fts_rowid FROM chunk_rows WHERE source = ?", (source,))]
+                self._delete_rowids(rowids)
+                self._conn.execute("DELETE FROM chunk_rows WHERE source = ?", (source,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM chunk_rows")
+            self._conn.commit()
+            self._fresh = True
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        BM25 상위 k개 (청크 ID, 점수) - 점수가 클수록 관련도 높음
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            # FTS5의 bm25()는 작을수록 좋음, 제목 가중치 2배
+            rows = self._conn.execute(
+                "SELECT id, -bm25(chunks, 0.0, 0.0, 2.0, 1.0) AS score FROM chunks "
+                "WHERE chunks MATCH ? ORDER BY score DESC LIMIT ?",
+                (match, k),
+            ).fetchall()
+        return [(row[0], float(row[1])) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    여러 순위 리스트를 RRF로 합침: score = sum(1 / (k + rank))
+    """
+    scores = {}
+    for ranked in ranked_lists:
+        for rank, doc_id in enumerate(ranked, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
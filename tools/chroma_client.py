@@ -1,10 +1,116 @@
+import os
 import chromadb
+import numpy as np
 from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
 from pathlib import Path
 
+from .bm25_index import BM25_FILE, BM25Index
+from .lru_cache import LRUCache
+from .collection_version import read_version, bump_version
+from .vector_store import MemmapCollection, export_collection
+from .model_server import get_model_client
+from .onnx_backend import INFERENCE_BACKEND, load_model
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "chroma_db"
+
+EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# 질의 임베딩 캐시 (같은 질의가 반복되면 모델을 다시 돌리지 않음)
+QUERY_CACHE_SIZE = 2048
+QUERY_CACHE_TTL = 3600  # 초
+
+# 벡터 저장소 백엔드
+#   chroma: PersistentClient (기본)
+#   memmap: DB_PATH/memmap/<컬렉션>에 fp16/int8 행렬로 저장, 정확한 내적 검색
+#           (python -m tools.vector_bench --build 로 Chroma에서 복사,
+#            이후 ingest.py / indexer의 쓰기 / 삭제는 get_memmap_mirror로 함께 반영)
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma")
+VECTOR_DTYPE = os.environ.get("VECTOR_DTYPE", "fp16")
+# memmap 백엔드 검색 방식: exact (전수) / ivfpq (IVF-PQ 후보 + 정확한 재계산, 인덱스는 vector_bench --ivfpq로 생성)
+VECTOR_INDEX = os.environ.get("VECTOR_INDEX", "exact")
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", "16"))
+MEMMAP_DIR = DB_PATH / "memmap"
+
+COLLECTIONS = {
+    "agent_memory": "Agent memory storage",
+    "papers": "Paper abstracts for RAG",
+}
+
 # 싱글톤 패턴으로 클라이언트 관리
 _client = None
 _embedding_fn = None
+_bm25_index = None
+_memmap_collections = {}
+
+
+class CachedEmbeddingFunction(SentenceTransformerEmbeddingFunction):
+    """
+    텍스트별 임베딩을 LRU/TTL 캐시에 저장하는 임베딩 함수
+    (SentenceTransformerEmbeddingFunction을 상속 → 기존 Collection 설정과 호환)
+    """
+
+    def __init__(self, *args, cache_size: int = QUERY_CACHE_SIZE, cache_ttl: float = QUERY_CACHE_TTL, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def __call__(self, input):
+        embeddings = [self.cache.get(text) for text in input]
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+        if missing:
+            # 캐시에 없는 텍스트만 한 번에 임베딩 (중복 제거)
+            texts = list(dict.fromkeys(input[i] for i in missing))
+            computed = dict(zip(texts, self.embed_uncached(texts)))
+            for text, emb in computed.items():
+                self.cache.put(text, emb)
+            for i in missing:
+                embeddings[i] = computed[input[i]]
+        return embeddings
+
+    def embed_uncached(self, texts):
+        """
+        캐시를 거치지 않고 모델로 바로 임베딩 (워밍업 / 벤치마크용)
+        """
+        return super().__call__(list(texts))
+
+
+class RemoteEmbeddingFunction(CachedEmbeddingFunction):
+    """
+    모델 서버에 임베딩을 요청하는 임베딩 함수 (프로세스에 모델을 올리지 않음)
+    Collection 설정(name / get_config)은 로컬 함수와 같음
+    """
+
+    def __init__(self, client, model_name: str, cache_size: int = QUERY_CACHE_SIZE, cache_ttl: float = QUERY_CACHE_TTL):
+        # 부모 __init__은 모델을 로드하므로 호출하지 않고 설정 값만 맞춤
+        self.model_name = model_name
+        self.device = "cpu"
+        self.normalize_embeddings = False
+        self.kwargs = {}
+        self.client = client
+        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def embed_uncached(self, texts):
+        return [np.asarray(emb, dtype=np.float32) for emb in self.client.embed(list(texts))]
+
+
+class OnnxEmbeddingFunction(CachedEmbeddingFunction):
+    """
+    ONNX Runtime(fp32 / 동적 int8) 모델로 임베딩하는 임베딩 함수 (INFERENCE_BACKEND)
+    Collection 설정(name / get_config)은 torch 모델과 같음
+    """
+
+    def __init__(self, model_name: str, backend: str = INFERENCE_BACKEND, cache_size: int = QUERY_CACHE_SIZE, cache_ttl: float = QUERY_CACHE_TTL):
+        self.model_name = model_name
+        self.device = "cpu"
+        self.normalize_embeddings = False
+        self.kwargs = {}
+        self.backend = backend
+        self.model = load_model("embedder", model_name, backend, device="cpu")
+        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def embed_uncached(self, texts):
+        return list(self.model.encode(list(texts), convert_to_numpy=True, show_progress_bar=False))
+
 
 def get_chroma_client() -> chromadb.PersistentClient:
     """
@@ -12,44 +118,142 @@ def get_chroma_client() -> chromadb.PersistentClient:
     """
     global _client
     if _client is None:
-        BASE_DIR = Path(__file__).resolve().parent.parent
-        DB_PATH = BASE_DIR / "chroma_db"
-        
         _client = chromadb.PersistentClient(path=str(DB_PATH))
     return _client
 
 
-def get_embedding_function() -> SentenceTransformerEmbeddingFunction:
+def get_embedding_function() -> CachedEmbeddingFunction:
     """
-    Multilingual 임베딩 함수 반환 (싱글톤)
+    Multilingual 임베딩 함수 반환 (싱글톤, 질의 임베딩 캐시 포함)
+    MODEL_SERVER_SOCKET이 설정되어 있으면 모델 서버에 요청, INFERENCE_BACKEND가 onnx 계열이면 ONNX Runtime
     """
     global _embedding_fn
     if _embedding_fn is None:
-        _embedding_fn = SentenceTransformerEmbeddingFunction(
-            model_name="paraphrase-multilingual-MiniLM-L12-v2"
-        )
+        client = get_model_client()
+        if client is not None:
+            _embedding_fn = RemoteEmbeddingFunction(client, model_name=EMBEDDING_MODEL)
+        elif INFERENCE_BACKEND != "torch":
+            _embedding_fn = OnnxEmbeddingFunction(EMBEDDING_MODEL)
+        else:
+            _embedding_fn = CachedEmbeddingFunction(
+                model_name=EMBEDDING_MODEL
+            )
     return _embedding_fn
 
 
-def get_memory_collection():
+def get_chroma_collection(name: str):
     """
-    메모리 저장용 Collection
+    Chroma Collection (백엔드 설정과 관계없이)
     """
     client = get_chroma_client()
     return client.get_or_create_collection(
-        name="agent_memory",
-        metadata={"description": "Agent memory storage"},
+        name=name,
+        metadata={"description": COLLECTIONS[name]},
         embedding_function=get_embedding_function()
     )
 
 
+def memmap_path(name: str, dtype: str = None, db_path: Path = DB_PATH) -> Path:
+    """
+    DB 폴더 안의 메모리 맵 저장소 경로
+    """
+    return Path(db_path) / "memmap" / f"{name}_{dtype or VECTOR_DTYPE}"
+
+
+def get_memmap_collection(name: str, dtype: str = None) -> MemmapCollection:
+    """
+    메모리 맵 Collection (이름별 싱글톤)
+    """
+    dtype = dtype or VECTOR_DTYPE
+    key = (name, dtype)
+    if key not in _memmap_collections:
+        collection = MemmapCollection(memmap_path(name, dtype), get_embedding_function(), dtype)
+        if VECTOR_INDEX == "ivfpq":
+            collection.use_ann(nprobe=IVF_NPROBE)
+        _memmap_collections[key] = collection
+    return _memmap_collections[key]
+
+
+def get_collection(name: str):
+    """
+    VECTOR_BACKEND에 따라 Chroma 또는 메모리 맵 Collection
+    (둘 다 query / get / upsert / add / delete / count 인터페이스가 같음)
+    """
+    if VECTOR_BACKEND == "memmap":
+        return get_memmap_collection(name)
+    if VECTOR_BACKEND != "chroma":
+        raise ValueError(f"알 수 없는 VECTOR_BACKEND: {VECTOR_BACKEND}")
+    return get_chroma_collection(name)
+
+
+def get_memory_collection():
+    """
+    메모리 저장용 Collection
+    """
+    return get_collection("agent_memory")
+
+
 def get_rag_collection():
     """
     RAG용 Collection (논문 초록 등)
     """
-    client = get_chroma_client()
-    return client.get_or_create_collection(
-        name="papers",
-        metadata={"description": "Paper abstracts for RAG"},
-        embedding_function=get_embedding_function()
-    )
\ No newline at end of file
+    return get_collection("papers")
+
+
+def get_memmap_mirror(db_path: Path, chroma_collection):
+    """
+    인덱싱 스크립트용: VECTOR_BACKEND=memmap이면 db_path의 메모리 맵 저장소 (아니면 None)
+    Chroma에 쓰고 지우는 것을 그대로 반영 → 앱이 읽는 저장소가 인덱싱 결과와 같게 유지됨
+    (처음 만들면 distance 공간은 Chroma Collection의 hnsw:space를 따름)
+    """
+    if VECTOR_BACKEND != "memmap":
+        return None
+    space = (chroma_collection.metadata or {}).get("hnsw:space", "l2")
+    return MemmapCollection(memmap_path(chroma_collection.name, db_path=db_path), dtype=VECTOR_DTYPE, space=space)
+
+
+def export_to_memmap(dtype: str = None, names=tuple(COLLECTIONS)) -> dict:
+    """
+    Chroma Collection들을 메모리 맵 저장소로 복사
+    같은 ID는 덮어쓰고, memmap에만 있는 행(VECTOR_BACKEND=memmap에서 memory_write / rag_index로 쓴 것)은 남김
+    """
+    counts = {}
+    for name in names:
+        target = get_memmap_collection(name, dtype)
+        counts[name] = export_collection(get_chroma_collection(name), target)
+        # 덮어쓴 예전 행 정리
+        target.compact()
+    return counts
+
+
+def get_bm25_index() -> BM25Index:
+    """
+    RAG Collection 옆에 저장된 BM25 역색인 (싱글톤)
+    """
+    global _bm25_index
+    if _bm25_index is None:
+        _bm25_index = BM25Index(DB_PATH / BM25_FILE)
+    return _bm25_index
+
+
+def get_embedding_cache_stats() -> dict:
+    """
+    질의 임베딩 캐시 통계 (size / hits / misses / hit_rate)
+    """
+    if _embedding_fn is None:
+        return {"size": 0, "maxsize": QUERY_CACHE_SIZE, "hits": 0, "misses": 0, "hit_rate": None}
+    return _embedding_fn.cache.stats()
+
+
+def get_rag_version() -> int:
+    """
+    RAG Collection 버전 (인덱싱할 때마다 증가)
+    """
+    return read_version(DB_PATH)
+
+
+def bump_rag_version() -> int:
+    """
+    RAG Collection에 쓴 뒤 호출 → 검색 결과 캐시 무효화
+    """
+    return bump_version(DB_PATH)
\ No newline at end of file
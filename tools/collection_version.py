@@ -0,0 +1,31 @@
+import os
+from pathlib import Path
+
+# Collection 내용이 바뀔 때마다 증가하는 버전 (DB 폴더 안에 저장)
+# 검색 결과 캐시는 이 값을 키에 포함 → 인덱싱 이후 오래된 결과를 돌려주지 않음
+VERSION_FILE = "collection_version"
+
+
+def read_version(db_dir: Path) -> int:
+    """
+    현재 Collection 버전 (파일이 없으면 0)
+    """
+    try:
+        with open(Path(db_dir) / VERSION_FILE, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_version(db_dir: Path) -> int:
+    """
+    Collection 버전을 1 올리고 새 버전 반환 (다른 프로세스에서도 보이도록 파일에 기록)
+    """
+    db_dir = Path(db_dir)
+    db_dir.mkdir(parents=True, exist_ok=True)
+    version = read_version(db_dir) + 1
+    tmp_path = db_dir / f"{VERSION_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(version))
+    os.replace(tmp_path, db_dir / VERSION_FILE)
+    return version
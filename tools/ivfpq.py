@@ -0,0 +1,188 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 기본 설정: 셀 하나에 평균 약 sqrt(n)/4개 벡터, 서브벡터당 8차원(1바이트 코드)
+DEFAULT_NPROBE = 16
+DEFAULT_SUBDIM = 8
+DEFAULT_RERANK = 100
+KMEANS_ITERS = 20
+TRAIN_SAMPLE = 100_000
+PQ_TRAIN_SAMPLE = 16_384  # 코드북(256개)마다 64개 정도면 충분
+
+
+def ids_digest(ids: Sequence[str]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for doc_id in ids:
+        h.update(doc_id.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def kmeans(x: np.ndarray, k: int, iters: int = KMEANS_ITERS, seed: int = 0) -> np.ndarray:
+    """
+    Lloyd k-means (비어 버린 군집은 임의의 점으로 다시 시작)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=len(x) < k)].copy()
+    x_sq = (x ** 2).sum(axis=1)
+    for _ in range(iters):
+        assign = assign_nearest(x, centroids, x_sq)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), int(empty.sum()))]
+    return centroids
+
+
+def assign_nearest(x: np.ndarray, centroids: np.ndarray, x_sq: np.ndarray = None, block: int = 65536) -> np.ndarray:
+    """
+    각 점에 가장 가까운 (L2) centroid 번호
+    """
+    c_sq = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int64)
+    for s in range(0, len(x), block):
+        d = c_sq[None, :] - 2 * x[s:s + block] @ centroids.T
+        if x_sq is not None:
+            d += x_sq[s:s + block, None]
+        out[s:s + block] = d.argmin(axis=1)
+    return out
+
+
+class IVFPQIndex:
+    """
+    IVF(역파일) + PQ(곱 양자화) 근사 내적 검색 인덱스
+
+    - 학습: 정규화된 벡터를 nlist개 셀로 k-means → 셀 중심과의 잔차를 m개 서브벡터로 나눠 각각 256개 코드북으로 양자화
+    - 저장: 벡터당 m바이트 코드 (384차원 fp32 1536바이트 → m=48이면 48바이트)
+    - 검색: 질의와 가까운 nprobe개 셀만 근사 점수(q·중심 + 잔차 코드 lookup)로 훑고,
+      상위 rerank개 후보만 원본 벡터로 정확히 다시 계산
+    """
+
+    def __init__(self, centroids: np.ndarray, codebooks: np.ndarray, codes: np.ndarray,
+                 list_offsets: np.ndarray, list_rows: np.ndarray, digest: str = ""):
+        self.centroids = centroids          # (nlist, d)
+        self.codebooks = codebooks          # (m, 256, dsub)
+        self.codes = codes                  # (n, m) uint8, 행 순서 = 원래 행 번호
+        self.list_offsets = list_offsets    # (nlist + 1,)
+        self.list_rows = list_rows          # 셀 순서로 정렬된 행 번호
+        self.digest = digest
+        self.nprobe = DEFAULT_NPROBE
+        self.rerank = DEFAULT_RERANK
+
+    @property
+    def n(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def bytes_per_vector(self) -> int:
+        # PQ 코드 + 역리스트의 행 번호
+        return self.codes.shape[1] + self.list_rows.itemsize
+
+    @classmethod
+    def train(cls, sample: np.ndarray, nlist: int, subdim: int = DEFAULT_SUBDIM, seed: int = 0) -> "IVFPQIndex":
+        """
+        학습 샘플(정규화된 벡터)로 셀 중심과 PQ 코드북 학습 (벡터 추가는 add_blocks)
+        """
+        sample = np.asarray(sample, dtype=np.float32)
+        d = sample.shape[1]
+        if d % subdim:
+            raise ValueError(f"차원 {d}이 subdim {subdim}으로 나누어지지 않습니다.")
+        m = d // subdim
+        nlist = max(1, min(nlist, len(sample)))
+        print(f"[IVF-PQ] 학습: 샘플 {len(sample)}개, nlist={nlist}, m={m}")
+        centroids = kmeans(sample, nlist, seed=seed)
+
+        residuals = sample - centroids[assign_nearest(sample, centroids)]
+        residuals = residuals[np.random.default_rng(seed).permutation(len(residuals))[:PQ_TRAIN_SAMPLE]]
+        codebooks = np.stack([
+            kmeans(residuals[:, j * subdim:(j + 1) * subdim], 256, seed=seed + j)
+            for j in range(m)
+        ]).astype(np.float32)
+        return cls(centroids, codebooks, np.zeros((0, m), dtype=np.uint8),
+                   np.zeros(nlist + 1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    def add_blocks(self, blocks, n: int, ids: Sequence[str] = ()) -> None:
+        """
+        (시작 행, fp32 블록) 순서대로 전체 n개 벡터를 인코딩 (기존 내용은 교체)
+        """
+        m, _, subdim = self.codebooks.shape
+        codes = np.empty((n, m), dtype=np.uint8)
+        assign = np.empty(n, dtype=np.int64)
+        for start, block in blocks:
+            end = start + len(block)
+            assign[start:end] = assign_nearest(block, self.centroids)
+            residuals = block - self.centroids[assign[start:end]]
+            for j in range(m):
+                codes[start:end, j] = assign_nearest(residuals[:, j * subdim:(j + 1) * subdim], self.codebooks[j])
+        self.codes = codes
+        self.list_rows = np.argsort(assign, kind="stable")
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=self.nlist))])
+        self.digest = ids_digest(ids)
+
+    def search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        정규화된 질의 하나의 근사 상위 후보 (행 번호, 근사 점수) - max(k, rerank)개
+        mask: 행별 허용 여부 (삭제 / where 필터)
+        """
+        m, _, subdim = self.codebooks.shape
+        coarse = self.centroids @ query
+        probe = np.argsort(-coarse)[:min(self.nprobe, self.nlist)]
+        # 내적은 셀과 무관하게 q·잔차 = 서브벡터별 lookup 합
+        lut = np.einsum("mkd,md->mk", self.codebooks, query.reshape(m, subdim))
+
+        rows, scores = [], []
+        for cell in probe:
+            cell_rows = self.list_rows[self.list_offsets[cell]:self.list_offsets[cell + 1]]
+            if mask is not None:
+                cell_rows = cell_rows[mask[cell_rows]]
+            if not len(cell_rows):
+                continue
+            codes = self.codes[cell_rows]
+            scores.append(coarse[cell] + lut[np.arange(m), codes].sum(axis=1))
+            rows.append(cell_rows)
+        if not rows:
+            return []
+        rows = np.concatenate(rows)
+        scores = np.concatenate(scores)
+        shortlist = min(len(rows), max(k, self.rerank))
+        top = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        return list(zip(rows[top].tolist(), scores[top].tolist()))
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "centroids.npy", self.centroids)
+        np.save(path / "codebooks.npy", self.codebooks)
+        np.save(path / "codes.npy", self.codes)
+        np.save(path / "list_offsets.npy", self.list_offsets)
+        np.save(path / "list_rows.npy", self.list_rows)
+        with open(path / "ivfpq.json", "w", encoding="utf-8") as f:
+            json.dump({"n": self.n, "nlist": self.nlist, "m": int(self.codes.shape[1]), "digest": self.digest}, f)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["IVFPQIndex"]:
+        path = Path(path)
+        if not (path / "ivfpq.json").exists():
+            return None
+        with open(path / "ivfpq.json", "r", encoding="utf-8") as f:
+            info = json.load(f)
+        # 코드 / 역리스트는 memmap으로 (여러 프로세스가 공유)
+        return cls(
+            np.load(path / "centroids.npy"),
+            np.load(path / "codebooks.npy"),
+            np.load(path / "codes.npy", mmap_mode="r"),
+            np.load(path / "list_offsets.npy"),
+            np.load(path / "list_rows.npy", mmap_mode="r"),
+            info.get("digest", ""),
+        )
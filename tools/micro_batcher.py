@@ -0,0 +1,102 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    여러 스레드(세션)의 요청을 모아서 한 번에 모델에 넘기는 워커
+
+    - 첫 요청이 들어온 뒤 max_wait_ms 동안, 또는 max_batch_size개가 찰 때까지 모음
+    - predict_fn(items) 결과를 요청별로 나눠 각 Future에 전달 (예외도 그대로 전달)
+    - sort_key를 주면 묶은 항목을 길이순으로 정렬해서 넘김 (패딩 감소)
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List], Sequence],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        sort_key: Optional[Callable] = None,
+        name: str = "micro-batcher",
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.sort_key = sort_key
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: Sequence) -> Future:
+        future = Future()
+        if not items:
+            future.set_result([])
+            return future
+        self._queue.put((list(items), future))
+        return future
+
+    def __call__(self, items: Sequence) -> List:
+        return self.submit(items).result()
+
+    def _collect(self, first):
+        requests = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                self._queue.put(_STOP)
+                break
+            requests.append(request)
+            size += len(request[0])
+        return requests
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            requests = self._collect(first)
+            items = [(r, i, item) for r, (request_items, _) in enumerate(requests) for i, item in enumerate(request_items)]
+            if self.sort_key is not None:
+                items.sort(key=lambda x: self.sort_key(x[2]))
+            try:
+                outputs = self.predict_fn([item for _, _, item in items])
+            except BaseException as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            results = [[None] * len(request_items) for request_items, _ in requests]
+            for (r, i, _), output in zip(items, outputs):
+                results[r][i] = output
+            for (_, future), result in zip(requests, results):
+                future.set_result(result)
+            with self._lock:
+                self.batches += 1
+                self.items += len(items)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch": round(self.items / self.batches, 2) if self.batches else None,
+            }
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join()
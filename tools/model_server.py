@@ -0,0 +1,191 @@
+import os
+import stat
+import secrets
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional
+
+import numpy as np
+
+# 설정하면 임베딩 / 리랭킹을 이 소켓의 모델 서버에 요청 (워커 프로세스에는 모델을 올리지 않음)
+#   서버 실행: python -m tools.model_server
+MODEL_SERVER_ENV = "MODEL_SERVER_SOCKET"
+# 메시지가 pickle이므로 접속할 수 있으면 서버에서 코드를 실행할 수 있음
+#   - 소켓은 현재 사용자만 들어갈 수 있는 디렉터리(0700)에 0600으로 생성
+#   - 인증 키: MODEL_SERVER_AUTHKEY, 없으면 서버가 소켓 옆 authkey 파일(0600)에 무작위 키를 만들고 클라이언트가 읽음
+AUTHKEY_ENV = "MODEL_SERVER_AUTHKEY"
+AUTHKEY_FILE = "authkey"
+DEFAULT_SOCKET = str(Path(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()) / f"transporter-models-{os.getuid()}" / "models.sock")
+
+
+def _private_dir(address: str) -> Path:
+    """
+    소켓 디렉터리를 0700으로 만들고, 다른 사용자 소유이거나 다른 사용자가 접근 가능하면 거부
+    """
+    directory = Path(address).parent
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = directory.stat()
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise RuntimeError(f"모델 서버 소켓 디렉터리가 현재 사용자 전용(0700)이 아닙니다: {directory}")
+    return directory
+
+
+def _read_authkey(address: str) -> bytes:
+    key = os.environ.get(AUTHKEY_ENV)
+    if key:
+        return key.encode("utf-8")
+    path = Path(address).parent / AUTHKEY_FILE
+    if not path.exists():
+        raise RuntimeError(f"모델 서버 인증 키가 없습니다: {AUTHKEY_ENV}를 설정하거나 서버를 먼저 실행하세요 ({path})")
+    return path.read_bytes()
+
+
+def _create_authkey(address: str) -> bytes:
+    """
+    서버 시작 시 인증 키 (환경 변수가 없으면 무작위 키를 0600 파일로 저장)
+    """
+    key = os.environ.get(AUTHKEY_ENV)
+    if key:
+        return key.encode("utf-8")
+    path = _private_dir(address) / AUTHKEY_FILE
+    key = secrets.token_hex(32).encode("ascii")
+    tmp_path = path.with_suffix(".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    os.replace(tmp_path, path)
+    return key
+
+
+class ModelClient:
+    """
+    모델 서버 클라이언트 (스레드마다 연결 하나)
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 서버가 재시작되면 키가 바뀔 수 있으므로 연결할 때마다 읽음
+            conn = Client(self.address, family="AF_UNIX", authkey=_read_authkey(self.address))
+            self._local.conn = conn
+        return conn
+
+    def _request(self, op: str, payload=None):
+        try:
+            conn = self._conn()
+            conn.send((op, payload))
+            status, result = conn.recv()
+        except (OSError, EOFError, AuthenticationError) as e:
+            # 서버가 재시작됐을 수 있으므로 다음 요청에서 다시 연결
+            self._local.conn = None
+            raise RuntimeError(f"모델 서버 연결 실패 ({self.address}): {e}") from e
+        if status != "ok":
+            raise RuntimeError(f"모델 서버 오류: {result}")
+        return result
+
+    def ping(self) -> dict:
+        return self._request("ping")
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        return list(self._request("embed", list(texts)))
+
+    def rerank(self, pairs: List[List[str]], first_pass: bool = False) -> List[float]:
+        return self._request("rerank_first_pass" if first_pass else "rerank", [list(p) for p in pairs])
+
+
+_client = None
+
+
+def get_model_client() -> Optional[ModelClient]:
+    """
+    MODEL_SERVER_SOCKET이 설정되어 있으면 클라이언트 (싱글톤), 아니면 None
+    """
+    global _client
+    address = os.environ.get(MODEL_SERVER_ENV)
+    if not address:
+        return None
+    if _client is None or _client.address != address:
+        _client = ModelClient(address)
+    return _client
+
+
+def serve(address: str = DEFAULT_SOCKET, max_batch_size: int = 64, max_wait_ms: float = 5.0) -> None:
+    """
+    임베딩 모델 + Cross-Encoder를 올리고 Unix 소켓으로 요청 처리
+    (연결마다 스레드, 모델 호출은 연산별 MicroBatcher로 묶음)
+    """
+    # 서버 자신은 로컬 모델을 써야 함
+    os.environ.pop(MODEL_SERVER_ENV, None)
+    from .chroma_client import get_embedding_function
+    from .reranker import get_reranker, get_first_pass_reranker, predict_scores
+    from .micro_batcher import MicroBatcher
+
+    embedding_fn = get_embedding_function()
+    reranker = get_reranker()
+    first_pass = get_first_pass_reranker()
+    print(f"[ModelServer] 모델 로드 완료")
+
+    batchers = {
+        # 임베딩은 서버 쪽 질의 캐시도 거침 (모든 워커가 공유)
+        "embed": MicroBatcher(embedding_fn, max_batch_size, max_wait_ms, sort_key=len, name="embed"),
+        "rerank": MicroBatcher(
+            lambda pairs: predict_scores(reranker, pairs),
+            max_batch_size, max_wait_ms, sort_key=lambda pair: len(pair[1]), name="rerank",
+        ),
+        "rerank_first_pass": MicroBatcher(
+            lambda pairs: predict_scores(first_pass, pairs),
+            max_batch_size, max_wait_ms, sort_key=lambda pair: len(pair[1]), name="rerank-first-pass",
+        ),
+    }
+
+    def handle(conn):
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if op == "ping":
+                        result = {name: b.stats() for name, b in batchers.items()}
+                    elif op in batchers:
+                        result = batchers[op](payload)
+                    else:
+                        raise ValueError(f"알 수 없는 요청: {op}")
+                    conn.send(("ok", result))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    authkey = _create_authkey(address)
+    _private_dir(address)
+    path = Path(address)
+    if path.exists():
+        path.unlink()
+    with Listener(address, family="AF_UNIX", authkey=authkey) as listener:
+        os.chmod(address, 0o600)
+        print(f"[ModelServer] 대기 중: {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # 인증 실패 등은 해당 연결만 버림
+                print(f"[ModelServer] 연결 거부: {e}")
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 / 리랭킹 모델 서버 (여러 uvicorn 워커가 공유)")
+    parser.add_argument("--socket", default=os.environ.get(MODEL_SERVER_ENV, DEFAULT_SOCKET), help="Unix 소켓 경로")
+    parser.add_argument("--max-batch", type=int, default=64, help="마이크로 배치 최대 크기")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="배치를 모으는 최대 대기 시간 (ms)")
+    args = parser.parse_args()
+    serve(args.socket, args.max_batch, args.max_wait_ms)
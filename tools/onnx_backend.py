@@ -0,0 +1,100 @@
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# 질의 임베딩 / Cross-Encoder 추론 백엔드
+#   torch:     PyTorch fp32 (기본)
+#   onnx:      ONNX Runtime fp32
+#   onnx-int8: ONNX Runtime + 동적 int8 양자화 (가중치 int8, 활성값은 실행 중 양자화)
+# onnx 계열은 sentence-transformers[onnx] (optimum + onnxruntime)가 필요
+# 문서 인덱싱(ingest.py / indexer)은 항상 torch로 임베딩함 → 저장된 벡터는 백엔드와 무관
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+BACKENDS = ("torch", "onnx", "onnx-int8")
+# 양자화 대상 CPU 명령어 집합: arm64 / avx2 / avx512 / avx512_vnni
+ONNX_QUANT_CONFIG = os.environ.get("ONNX_QUANT_CONFIG", "avx2")
+# 변환한 모델 캐시 (모델마다 한 번만 변환)
+ONNX_CACHE_DIR = Path(os.environ.get("ONNX_CACHE_DIR", BASE_DIR / ".cache" / "onnx"))
+
+
+def _model_dir(model_name: str) -> Path:
+    return ONNX_CACHE_DIR / re.sub(r"[^\w.-]+", "__", model_name)
+
+
+def _onnx_file(model_dir: Path, quantized: bool) -> Path:
+    """
+    저장된 ONNX 파일 (없으면 None)
+    """
+    pattern = f"model_qint8_{ONNX_QUANT_CONFIG}.onnx" if quantized else "model.onnx"
+    return next(iter(sorted(model_dir.rglob(pattern))), None)
+
+
+def _model_class(kind: str):
+    from sentence_transformers import SentenceTransformer, CrossEncoder
+
+    if kind == "embedder":
+        return SentenceTransformer
+    if kind == "cross-encoder":
+        return CrossEncoder
+    raise ValueError(f"알 수 없는 모델 종류: {kind}")
+
+
+def export_onnx(kind: str, model_name: str, quantized: bool, **kwargs) -> Tuple[Path, str]:
+    """
+    모델을 ONNX로 변환해서 ONNX_CACHE_DIR에 저장 (이미 있으면 그대로)
+    Returns: (모델 디렉터리, 모델 디렉터리 기준 ONNX 파일 경로)
+    """
+    model_dir = _model_dir(model_name)
+    path = _onnx_file(model_dir, quantized) if model_dir.exists() else None
+    if path is None:
+        try:
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+        except ImportError as e:
+            raise ImportError(
+                "ONNX 백엔드에는 sentence-transformers[onnx]가 필요합니다 "
+                "(pip install 'sentence-transformers[onnx]')"
+            ) from e
+
+        if _onnx_file(model_dir, False) is None:
+            print(f"[ONNX] {model_name} → ONNX 변환")
+            model = _model_class(kind)(model_name, backend="onnx", **kwargs)
+            tmp_dir = model_dir.with_name(model_dir.name + ".tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            model.save_pretrained(str(tmp_dir))
+            shutil.rmtree(model_dir, ignore_errors=True)
+            tmp_dir.rename(model_dir)
+        if quantized:
+            print(f"[ONNX] {model_name} → 동적 int8 양자화 ({ONNX_QUANT_CONFIG})")
+            model = load_onnx_model(kind, model_dir, _onnx_file(model_dir, False), **kwargs)
+            export_dynamic_quantized_onnx_model(model, ONNX_QUANT_CONFIG, str(model_dir))
+        path = _onnx_file(model_dir, quantized)
+        if path is None:
+            raise RuntimeError(f"ONNX 변환 결과를 찾을 수 없음: {model_dir}")
+    return model_dir, path.relative_to(model_dir).as_posix()
+
+
+def load_onnx_model(kind: str, model_dir: Path, file_name, **kwargs):
+    file_name = Path(file_name)
+    if file_name.is_absolute():
+        file_name = file_name.relative_to(model_dir)
+    return _model_class(kind)(
+        str(model_dir), backend="onnx", model_kwargs={"file_name": file_name.as_posix()}, **kwargs
+    )
+
+
+def load_model(kind: str, model_name: str, backend: str = None, **kwargs):
+    """
+    backend에 맞는 SentenceTransformer / CrossEncoder (onnx 계열은 캐시된 변환 결과 사용)
+    """
+    backend = backend or INFERENCE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"INFERENCE_BACKEND는 {BACKENDS} 중 하나여야 합니다: {backend}")
+    if backend == "torch":
+        return _model_class(kind)(model_name, **kwargs)
+    model_dir, file_name = export_onnx(kind, model_name, backend == "onnx-int8", **kwargs)
+    print(f"[ONNX] {model_name} 로드 ({backend}: {file_name})")
+    return load_onnx_model(kind, model_dir, file_name, **kwargs)
+
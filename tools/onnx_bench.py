@@ -0,0 +1,154 @@
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+TRANSPOTER_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TRANSPOTER_ROOT))
+
+from tools.chroma_client import EMBEDDING_MODEL
+from tools.reranker import RERANK_MODEL, RERANK_MAX_LENGTH, RERANK_BATCH_SIZE, RERANK_MAX_CHARS
+from tools.onnx_backend import ONNX_QUANT_CONFIG, load_model
+from tools.title_index import get_title_index
+from tools.vector_store import normalize
+from tools.vector_bench import _percentile_ms, _recall
+from ingestion.benchmark import write_report
+
+
+def sample_workload(n_queries: int, n_candidates: int, seed: int = 0):
+    """
+    논문 제목을 질의로, 초록을 후보 문서로 사용
+    (질의마다 자기 초록 + 무작위 초록 n_candidates-1개)
+    """
+    rng = random.Random(seed)
+    papers = [p for p in get_title_index().papers if p.get("title") and p.get("abstract")]
+    picked = rng.sample(papers, min(n_queries, len(papers)))
+    abstracts = [p["abstract"] for p in papers]
+    queries = [p["title"] for p in picked]
+    candidates = [[p["abstract"]] + rng.sample(abstracts, n_candidates - 1) for p in picked]
+    return queries, abstracts, candidates
+
+
+def _latency(fn, inputs):
+    """
+    입력 하나씩 처리했을 때의 지연 시간 (p50 / p95 / mean, ms)과 결과
+    """
+    latencies, outputs = [], []
+    for x in inputs:
+        t0 = time.perf_counter()
+        outputs.append(fn(x))
+        latencies.append(time.perf_counter() - t0)
+    latency = {
+        "p50_ms": _percentile_ms(latencies, 0.5),
+        "p95_ms": _percentile_ms(latencies, 0.95),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+    }
+    return latency, outputs
+
+
+def _rank(values):
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values)] = np.arange(len(values))
+    return ranks
+
+
+def _spearman(a, b) -> float:
+    ra, rb = _rank(np.asarray(a)), _rank(np.asarray(b))
+    if ra.std() == 0 or rb.std() == 0:
+        return 1.0
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def bench_embedder(backends, queries, corpus_texts, k: int):
+    """
+    질의 임베딩: 지연 시간 + torch 대비 코사인 유사도 + (torch로 임베딩한 초록에서) top-k 일치율
+    """
+    models = {backend: load_model("embedder", EMBEDDING_MODEL, backend, device="cpu") for backend in ["torch"] + backends}
+    encode = lambda model, texts: normalize(model.encode(list(texts), convert_to_numpy=True, show_progress_bar=False))
+
+    # 저장된 문서 벡터는 항상 torch로 만들어지므로 정답도 torch 코퍼스 기준
+    corpus = encode(models["torch"], corpus_texts)
+    reference = encode(models["torch"], queries)
+    truth = np.argsort(-(reference @ corpus.T), axis=1)[:, :k].tolist()
+
+    results = {}
+    for backend, model in models.items():
+        latency, _ = _latency(lambda q: model.encode([q], show_progress_bar=False), queries)
+        embeddings = encode(model, queries)
+        cosine = np.sum(embeddings * reference, axis=1)
+        found = np.argsort(-(embeddings @ corpus.T), axis=1)[:, :k].tolist()
+        results[backend] = {
+            "latency": latency,
+            "cosine_to_torch": {"mean": round(float(cosine.mean()), 5), "min": round(float(cosine.min()), 5)},
+            "recall_at_k_vs_torch": _recall(found, truth),
+        }
+    return results
+
+
+def bench_cross_encoder(backends, queries, candidates):
+    """
+    Cross-Encoder: 질의별 후보 묶음 지연 시간 + torch 대비 점수 차이 / 순위 상관 / 1등 일치
+    """
+    models = {
+        backend: load_model("cross-encoder", RERANK_MODEL, backend, max_length=RERANK_MAX_LENGTH)
+        for backend in ["torch"] + backends
+    }
+    batches = [[[q, text[:RERANK_MAX_CHARS]] for text in texts] for q, texts in zip(queries, candidates)]
+    predict = lambda model, pairs: np.asarray(model.predict(pairs, batch_size=RERANK_BATCH_SIZE, show_progress_bar=False), dtype=np.float64)
+
+    reference = [predict(models["torch"], pairs) for pairs in batches]
+    results = {}
+    for backend, model in models.items():
+        latency, scores = _latency(lambda pairs: predict(model, pairs), batches)
+        diffs = np.concatenate([np.abs(s - r) for s, r in zip(scores, reference)])
+        results[backend] = {
+            "latency": latency,
+            "abs_score_diff": {"mean": round(float(diffs.mean()), 5), "max": round(float(diffs.max()), 5)},
+            "spearman_vs_torch": round(float(np.mean([_spearman(s, r) for s, r in zip(scores, reference)])), 5),
+            "top1_agreement": round(float(np.mean([s.argmax() == r.argmax() for s, r in zip(scores, reference)])), 4),
+        }
+    return results
+
+
+def _add_speedup(results):
+    base = results["torch"]["latency"]["p50_ms"]
+    for result in results.values():
+        result["speedup_p50"] = round(base / result["latency"]["p50_ms"], 2) if result["latency"]["p50_ms"] else None
+
+
+def run(backends, n_queries: int, n_candidates: int, k: int, seed: int):
+    queries, abstracts, candidates = sample_workload(n_queries, n_candidates, seed)
+    print(f"[OnnxBench] 질의 {len(queries)}개, 초록 {len(abstracts)}개, 질의당 후보 {n_candidates}개")
+
+    report = {
+        "quant_config": ONNX_QUANT_CONFIG,
+        "queries": len(queries),
+        "candidates_per_query": n_candidates,
+        "k": k,
+        "embedder": {"model": EMBEDDING_MODEL, "backends": bench_embedder(backends, queries, abstracts, k)},
+        "cross_encoder": {"model": RERANK_MODEL, "backends": bench_cross_encoder(backends, queries, candidates)},
+    }
+    for part in ("embedder", "cross_encoder"):
+        _add_speedup(report[part]["backends"])
+        for backend, result in report[part]["backends"].items():
+            drift = result.get("cosine_to_torch", result.get("abs_score_diff"))
+            print(f"[OnnxBench] {part} {backend}: p50 {result['latency']['p50_ms']}ms "
+                  f"(x{result['speedup_p50']}), drift {drift}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="torch vs ONNX / int8 추론 백엔드 지연 시간 / 점수 차이 비교")
+    parser.add_argument("--backend", nargs="+", default=["onnx", "onnx-int8"], choices=["onnx", "onnx-int8"], help="비교할 백엔드")
+    parser.add_argument("--queries", type=int, default=100, help="질의 수")
+    parser.add_argument("--candidates", type=int, default=20, help="질의당 리랭킹 후보 수")
+    parser.add_argument("--k", type=int, default=10, help="임베딩 검색 일치율의 k")
+    parser.add_argument("--seed", type=int, default=0, help="질의 샘플 seed")
+    parser.add_argument("--report", type=Path, default=Path("onnx_benchmark.json"), help="JSON 리포트 경로")
+    args = parser.parse_args()
+
+    report = run(args.backend, args.queries, args.candidates, args.k, args.seed)
+    write_report(args.report, report)
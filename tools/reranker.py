@@ -1,19 +1,188 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, List, Any
+import numpy as np
 from sentence_transformers import CrossEncoder
 
+from .lru_cache import LRUCache
+from .micro_batcher import MicroBatcher
+from .model_server import get_model_client
+from .onnx_backend import load_model
+
+RERANK_MODEL = 'cross-encoder/ms-marco-MiniLM-L-12-v2'
+# 토큰 최대 길이 (넘으면 잘림), 배치 크기, 점수 캐시 크기
+RERANK_MAX_LENGTH = int(os.environ.get("RERANK_MAX_LENGTH", "512"))
+RERANK_BATCH_SIZE = int(os.environ.get("RERANK_BATCH_SIZE", "16"))
+RERANK_CACHE_SIZE = int(os.environ.get("RERANK_CACHE_SIZE", "8192"))
+# 토크나이저에 넘기기 전에 자르는 글자 수 (토큰 하나 ≈ 4글자 이상이므로 max_length를 넘는 부분만 버림)
+RERANK_MAX_CHARS = RERANK_MAX_LENGTH * 8
+
+# 2단계 캐스케이드: 후보가 CASCADE_TOP_N개보다 많으면 가벼운 점수로 먼저 거르고 L-12는 상위 N개만
+#   - 모든 후보에 벡터 검색 distance가 있으면 그대로 사용 (추가 계산 없음)
+#   - 없으면 2층짜리 Cross-Encoder
+FIRST_PASS_MODEL = 'cross-encoder/ms-marco-MiniLM-L-2-v2'
+CASCADE_ENABLED = os.environ.get("RERANK_CASCADE", "1") != "0"
+CASCADE_TOP_N = int(os.environ.get("RERANK_CASCADE_TOP_N", "20"))
+# 1등과의 가벼운 점수 차이가 이보다 크면 L-12에 넘기지 않음 (조기 종료)
+#   cross-encoder: predict_scores가 sigmoid [0, 1] 척도로 맞춘 점수 (relevance_score 0.5 기준값들과 같은 척도)
+CASCADE_MARGIN = {"cross-encoder": 0.3, "distance": 0.35}
+
+# 마이크로 배칭: 동시에 들어온 세션들의 쌍을 모아서 한 번에 predict
+RERANK_MICROBATCH = os.environ.get("RERANK_MICROBATCH", "1") != "0"
+RERANK_MAX_BATCH = int(os.environ.get("RERANK_MAX_BATCH", "64"))
+RERANK_MAX_WAIT_MS = float(os.environ.get("RERANK_MAX_WAIT_MS", "5"))
+
 # 싱글톤 패턴으로 Cross-Encoder 관리
 _reranker = None
+_first_pass = None
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+# (모델, 질의, 문서 해시) → 점수
+_score_cache = LRUCache(maxsize=RERANK_CACHE_SIZE)
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "pairs": 0, "cached_pairs": 0, "scored_pairs": 0, "seconds": 0.0, "cascade_pruned": 0}
 
 def get_reranker() -> CrossEncoder:
     """
     Cross-Encoder 모델 반환 (싱글톤)
-    다국어 지원 모델 사용
+    다국어 지원 모델 사용 (INFERENCE_BACKEND에 따라 torch / ONNX Runtime)
     """
     global _reranker
     if _reranker is None:
-        _reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-12-v2')
+        _reranker = load_model("cross-encoder", RERANK_MODEL, max_length=RERANK_MAX_LENGTH)
     return _reranker
 
 
+def get_first_pass_reranker() -> CrossEncoder:
+    """
+    캐스케이드 1단계용 2층 Cross-Encoder (싱글톤)
+    """
+    global _first_pass
+    if _first_pass is None:
+        _first_pass = load_model("cross-encoder", FIRST_PASS_MODEL, max_length=RERANK_MAX_LENGTH)
+    return _first_pass
+
+
+def _applies_sigmoid(model) -> bool:
+    # ms-marco 모델은 설정에 Identity activation이 들어 있어 predict가 raw logit을 줌
+    # (sentence-transformers 4 이상은 activation_fn, 그 전은 default_activation_function)
+    activation = getattr(model, "activation_fn", None) or getattr(model, "default_activation_function", None)
+    return type(activation).__name__ == "Sigmoid"
+
+
+def predict_scores(model: CrossEncoder, pairs: List[List[str]]) -> List[float]:
+    """
+    CrossEncoder.predict 점수를 sigmoid [0, 1] 척도로 통일 (모델 설정 / 라이브러리 버전과 무관)
+    """
+    scores = np.asarray(model.predict(pairs, batch_size=RERANK_BATCH_SIZE, show_progress_bar=False), dtype=np.float64)
+    if not _applies_sigmoid(model):
+        scores = 1.0 / (1.0 + np.exp(-scores))
+    return [float(s) for s in scores]
+
+
+def predict_pairs(pairs: List[List[str]], first_pass: bool = False) -> List[float]:
+    """
+    Cross-Encoder 추론 (캐시 없음)
+    MODEL_SERVER_SOCKET이 설정되어 있으면 모델 서버, RERANK_MICROBATCH면 다른 세션의 요청과 묶어서
+    """
+    client = get_model_client()
+    if client is not None:
+        return client.rerank(pairs, first_pass)
+    if not RERANK_MICROBATCH:
+        return predict_scores(get_first_pass_reranker() if first_pass else get_reranker(), pairs)
+    with _batchers_lock:
+        batcher = _batchers.get(first_pass)
+        if batcher is None:
+            get_model = get_first_pass_reranker if first_pass else get_reranker
+            batcher = MicroBatcher(
+                lambda batch: predict_scores(get_model(), batch),
+                max_batch_size=RERANK_MAX_BATCH,
+                max_wait_ms=RERANK_MAX_WAIT_MS,
+                sort_key=lambda pair: len(pair[1]),
+                name="rerank-first-pass" if first_pass else "rerank",
+            )
+            _batchers[first_pass] = batcher
+    return batcher(pairs)
+
+
+def _doc_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def score_pairs(query: str, texts: List[str], first_pass: bool = False) -> List[float]:
+    """
+    (query, text) 쌍의 Cross-Encoder 점수 (캐시에 없는 쌍만 길이순 배치로 계산)
+    first_pass=True면 캐스케이드 1단계용 가벼운 모델
+    """
+    t0 = time.perf_counter()
+    model_name = FIRST_PASS_MODEL if first_pass else RERANK_MODEL
+    keys = [(model_name, query, _doc_hash(text)) for text in texts]
+    scores = [_score_cache.get(key) for key in keys]
+
+    # 같은 문서가 여러 번 있으면 한 번만 계산
+    missing = {}
+    for i, score in enumerate(scores):
+        if score is None:
+            missing.setdefault(keys[i], i)
+    if missing:
+        # 길이가 비슷한 쌍끼리 배치 → 패딩 낭비 감소
+        order = sorted(missing.items(), key=lambda item: len(texts[item[1]]))
+        pairs = [[query, texts[i][:RERANK_MAX_CHARS]] for _, i in order]
+        predicted = predict_pairs(pairs, first_pass)
+        computed = {}
+        for (key, _), score in zip(order, predicted):
+            computed[key] = float(score)
+            _score_cache.put(key, float(score))
+        scores = [computed[key] if score is None else score for key, score in zip(keys, scores)]
+
+    elapsed = time.perf_counter() - t0
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["pairs"] += len(texts)
+        _stats["cached_pairs"] += len(texts) - len(missing)
+        _stats["scored_pairs"] += len(missing)
+        _stats["seconds"] += elapsed
+    print(f"[Reranker{' 1단계' if first_pass else ''}] 쌍 {len(texts)}개 (캐시 {len(texts) - len(missing)}개, 계산 {len(missing)}개) {elapsed * 1000:.1f}ms")
+    return scores
+
+
+def get_rerank_stats() -> Dict[str, Any]:
+    """
+    리랭커 누적 통계 (호출 수 / 쌍 수 / 캐시 적중 / 평균 지연 시간)
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["mean_ms"] = round(stats["seconds"] / stats["calls"] * 1000, 2) if stats["calls"] else None
+    stats["seconds"] = round(stats["seconds"], 3)
+    stats["cache"] = _score_cache.stats()
+    with _batchers_lock:
+        stats["micro_batches"] = {("first_pass" if k else "main"): b.stats() for k, b in _batchers.items()}
+    return stats
+
+
+def _cascade(query: str, documents: list, top_k: int) -> list:
+    """
+    가벼운 점수로 상위 max(CASCADE_TOP_N, top_k)개(1등과 차이가 큰 후보는 제외)만 남김
+    """
+    if all(doc.get('distance') is not None for doc in documents):
+        kind = "distance"
+        cheap = [-doc['distance'] for doc in documents]
+    else:
+        kind = "cross-encoder"
+        cheap = score_pairs(query, [doc['text'] or "" for doc in documents], first_pass=True)
+    order = sorted(range(len(documents)), key=lambda i: cheap[i], reverse=True)[:max(CASCADE_TOP_N, top_k)]
+    best = cheap[order[0]]
+    keep = max(top_k, 1)
+    survivors = [i for n, i in enumerate(order) if n < keep or best - cheap[i] <= CASCADE_MARGIN[kind]]
+    with _stats_lock:
+        _stats["cascade_pruned"] += len(documents) - len(survivors)
+    print(f"[Reranker] 캐스케이드({kind}) {len(documents)}개 → {len(survivors)}개")
+    return [documents[i] for i in survivors]
+
+
 def rerank_results(query: str, documents: list, top_k: int = None) -> list:
     """
     Cross-Encoder로 문서 리랭킹
@@ -21,7 +190,7 @@ def rerank_results(query: str, documents: list, top_k: int = None) -> list:
     Args:
         query: 검색 질의
         documents: 리랭킹할 문서 리스트 (각 문서는 dict, 'text' 키 필요)
-        top_k: 반환할 상위 k개 (None이면 전체 반환)
+        top_k: 반환할 상위 k개 (None이면 전체 반환, 캐스케이드 없음)
     
     Returns:
         리랭킹된 문서 리스트 (relevance_score 추가됨)
@@ -31,13 +200,12 @@ def rerank_results(query: str, documents: list, top_k: int = None) -> list:
     
     print(f"[Reranker] 리랭킹 시작 - 입력 {len(documents)}개 문서")
     
-    reranker = get_reranker()
-    
-    # query-document 쌍 생성
-    pairs = [[query, doc['text']] for doc in documents]
+    # 후보가 많으면 가벼운 점수로 먼저 거름 (top_k가 있을 때만 - 나머지는 점수 없이 버려짐)
+    if CASCADE_ENABLED and top_k is not None and len(documents) > CASCADE_TOP_N:
+        documents = _cascade(query, documents, top_k)
     
-    # Cross-Encoder로 점수 계산
-    scores = reranker.predict(pairs)
+    # Cross-Encoder로 점수 계산 (캐시 / 길이순 배치)
+    scores = score_pairs(query, [doc['text'] or "" for doc in documents])
     
     # 점수를 문서에 추가하고 정렬
     for doc, score in zip(documents, scores):
@@ -0,0 +1,182 @@
+import re
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+METADATA_FILE = DATA_DIR / "metadata.json"
+
+# 퍼지 매칭 기준 (문자 3-gram) - 오타 / 띄어쓰기 차이 정도만 허용
+#   coverage: 제목의 3-gram 중 질의에 있는 비율, precision: 질의의 3-gram 중 제목에 있는 비율
+#   length ratio: 짧은 쪽 / 긴 쪽 글자 수 ("Denoising Diffusion Probabilistic Models"가
+#   "Improved Denoising Diffusion Probabilistic Models"에 붙는 것처럼 더 긴 제목의 일부인 질의는 제외)
+# paper_analysis는 일치하면 벡터 검색을 건너뛰므로, 애매하면 None을 돌려서 검색으로 넘김
+MIN_COVERAGE = 0.9
+MIN_PRECISION = 0.9
+MIN_LENGTH_RATIO = 0.9
+# 질의 안에 제목이 통째로 들어있는지 볼 때, 너무 짧은 제목은 제외 ("GAN" 같은 것)
+MIN_CONTAINED_CHARS = 12
+
+_SCRIPT_BOUNDARY = re.compile(r"(?<=[가-힣])(?=[^가-힣])|(?<=[^가-힣])(?=[가-힣])")
+_NON_WORD = re.compile(r"[\W_]+")
+_HANGUL = re.compile(r"[가-힣]")
+
+
+def extract_title_from_filename(filename: str) -> str:
+    """
+    파일명에서 실제 논문 제목 추출
+    예: 2021_Artificial_intelligence_in_education__Ad_c0a8fe3a
+    → Artificial intelligence in education
+    """
+    # .pdf 제거
+    name = filename.replace(".pdf", "")
+
+    # 연도 제거 (앞의 4자리 숫자_)
+    parts = name.split("_", 1)
+    if len(parts) == 2 and parts[0].isdigit() and len(parts[0]) == 4:
+        name = parts[1]
+
+    # 마지막 ID 제거 (8자리 16진수)
+    # 패턴: _로 시작하고 8자리 16진수로 끝남
+    # 예: __Ad_c0a8fe3a, _c3df199c
+    name = re.sub(r'_+[a-fA-F0-9]{8}$', '', name)
+
+    # 언더스코어를 공백으로 변경
+    title = name.replace("_", " ")
+
+    return title.strip()
+
+
+def normalize_title(text: str) -> str:
+    """
+    소문자 + 구두점 제거 + 한글/영문 경계 분리 ("StyleGAN을" → "stylegan 을")
+    """
+    text = _SCRIPT_BOUNDARY.sub(" ", text.lower())
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def _trigrams(text: str) -> set:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    논문 제목 → 논문 정보 (정규화 정확 일치 + 문자 3-gram 퍼지 일치)
+
+    metadata.json의 제목과 PDF 파일명에서 뽑은 제목(잘린 제목)을 모두 별칭으로 등록
+    """
+
+    def __init__(self, papers: List[Dict[str, Any]], aliases: List[List[str]]):
+        self.papers = papers
+        self._exact: Dict[str, int] = {}
+        self._alias_grams: List[set] = []
+        self._alias_owner: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        for i, names in enumerate(aliases):
+            for name in names:
+                norm = normalize_title(name)
+                if not norm or norm in self._exact:
+                    continue
+                self._exact[norm] = i
+                grams = _trigrams(norm)
+                alias = len(self._alias_grams)
+                self._alias_grams.append(grams)
+                self._alias_owner.append(i)
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(alias)
+        self._max_words = max((len(norm.split()) for norm in self._exact), default=0)
+
+    def __len__(self) -> int:
+        return len(self.papers)
+
+    @classmethod
+    def from_files(cls, metadata_file: Path = METADATA_FILE, pdf_dir: Path = DATA_DIR) -> "TitleIndex":
+        papers, aliases = [], []
+        known = set()
+        if Path(metadata_file).exists():
+            with open(metadata_file, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            for paper in metadata.values():
+                filename = paper.get("pdf_filename", "")
+                papers.append({
+                    "title": paper.get("title"),
+                    "authors": [a.strip() for a in paper.get("authors", "").split(",") if a.strip()],
+                    "abstract": paper.get("abstract"),
+                    "year": paper.get("year"),
+                    "paper_id": paper.get("paperId"),
+                    "citation_count": paper.get("citationCount"),
+                    "source": str(Path(pdf_dir) / filename) if filename else None,
+                })
+                aliases.append([paper.get("title") or "", extract_title_from_filename(filename)])
+                known.add(filename)
+        # 메타데이터에 없는 PDF는 파일명 제목만
+        for path in sorted(Path(pdf_dir).glob("*.pdf")):
+            if path.name in known or path.name.startswith("."):
+                continue
+            title = extract_title_from_filename(path.name)
+            papers.append({"title": title, "authors": [], "abstract": None, "source": str(path)})
+            aliases.append([title])
+        return cls(papers, aliases)
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        질의에 해당하는 논문 (없으면 None)
+        Returns: {"paper", "score", "match": exact | contained | fuzzy}
+        """
+        norm = normalize_title(query)
+        if not norm:
+            return None
+        if norm in self._exact:
+            return self._result(self._exact[norm], 1.0, "exact")
+
+        # "<제목> 분석해줘"처럼 질의 안에 제목이 통째로 있는 경우 (가장 긴 제목 우선)
+        words = norm.split()
+        for size in range(min(len(words), self._max_words), 0, -1):
+            for start in range(len(words) - size + 1):
+                phrase = " ".join(words[start:start + size])
+                if len(phrase) >= MIN_CONTAINED_CHARS and phrase in self._exact:
+                    return self._result(self._exact[phrase], 1.0, "contained")
+
+        # 퍼지: 영문 제목과 비교할 때는 한글 단어("논문", "분석해줘" 등)를 뺌
+        latin = " ".join(w for w in words if not _HANGUL.search(w))
+        text = latin or norm
+        grams = _trigrams(text)
+        counts: Dict[int, int] = {}
+        for gram in grams:
+            for alias in self._postings.get(gram, ()):
+                counts[alias] = counts.get(alias, 0) + 1
+        best = None
+        for alias, common in counts.items():
+            coverage = common / len(self._alias_grams[alias])
+            precision = common / len(grams)
+            if coverage < MIN_COVERAGE or precision < MIN_PRECISION:
+                continue
+            # 3-gram 집합 크기 = 대략 글자 수 + 2
+            lengths = sorted((len(self._alias_grams[alias]), len(text) + 2))
+            if lengths[0] / lengths[1] < MIN_LENGTH_RATIO:
+                continue
+            score = 2 * common / (len(self._alias_grams[alias]) + len(grams))
+            if best is None or score > best[1]:
+                best = (alias, score)
+        if best is None:
+            return None
+        return self._result(self._alias_owner[best[0]], round(best[1], 3), "fuzzy")
+
+    def _result(self, i: int, score: float, match: str) -> Dict[str, Any]:
+        return {"paper": dict(self.papers[i]), "score": score, "match": match}
+
+
+_title_index = None
+
+
+def get_title_index() -> TitleIndex:
+    """
+    data/metadata.json + data/*.pdf 제목 인덱스 (싱글톤)
+    """
+    global _title_index
+    if _title_index is None:
+        _title_index = TitleIndex.from_files()
+        print(f"[TitleIndex] 논문 {len(_title_index)}개 로드")
+    return _title_index
@@ -2,10 +2,14 @@ from typing import Type, Callable, Dict, Any, List
 from pydantic import BaseModel, Field, field_validator
 import os
 import requests
+import copy
 import uuid
+import hashlib
 from datetime import datetime
 
-from .chroma_client import get_memory_collection, get_rag_collection
+from .chroma_client import get_memory_collection, get_rag_collection, get_bm25_index, get_rag_version, bump_rag_version
+from .bm25_index import reciprocal_rank_fusion
+from .lru_cache import LRUCache
 from .reranker import rerank_results
 
 
@@ -181,26 +185,83 @@ def memory_read_handler(args: MemoryReadInput) -> Dict[str,Any]:
         n_results = args.top_k
     )
 
+    memories = _memories_from_results(results, 0)
+    
+    return {
+        "query": args.query,
+        "results": memories,
+        "count": len(memories)
+    }
+
+
+def _memories_from_results(results: Dict[str, Any], q: int) -> List[Dict[str, Any]]:
+    """
+    collection.query 결과에서 q번째 질의의 메모리 목록
+    """
     memories = []
-    if results["documents"] and results["documents"][0]:
-        for i, doc in enumerate(results["documents"][0]):
+    if results["documents"] and results["documents"][q]:
+        for i, doc in enumerate(results["documents"][q]):
             memory = {
                 "content": doc,
-                "id": results["ids"][0][i] if results["ids"] else None,
+                "id": results["ids"][q][i] if results["ids"] else None,
             }
             
-            if results["metadatas"] and results["metadatas"][0]:
-                meta = results["metadatas"][0][i]
+            if results["metadatas"] and results["metadatas"][q]:
+                meta = results["metadatas"][q][i]
                 memory["created_at"] = meta.get("created_at")
                 memory["tags"] = meta.get("tags", "").split(",") if meta.get("tags") else []
             
-            if results["distances"] and results["distances"][0]:
-                memory["distance"] = results["distances"][0][i]
+            if results["distances"] and results["distances"][q]:
+                memory["distance"] = results["distances"][q][i]
             
             memories.append(memory)
-    
+    return memories
+
+
+## Multi Read ##
+class MemoryMultiReadInput(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=10, description="검색 질의 목록")
+    top_k: int = Field(3, ge=1, le=10, description="반환 결과 수(1~10, 기본 값 3)")
+    fuse: bool = Field(True, description="True면 질의별 결과를 RRF로 합쳐 하나의 목록으로 반환")
+
+    @field_validator("queries")
+    @classmethod
+    def queries_not_empty(cls, v: List[str]) -> List[str]:
+        v = [q for q in v if q.strip()]
+        if not v:
+            raise ValueError("queries에 공백이 아닌 문자열이 하나 이상 있어야 합니다.")
+        return v
+
+
+def memory_multi_read_handler(args: MemoryMultiReadInput) -> Dict[str, Any]:
+    """
+    여러 질의를 한 번에 임베딩해서 collection.query 한 번으로 검색
+    """
+    collection = get_memory_collection()
+
+    results = collection.query(
+        query_texts=args.queries,
+        n_results=args.top_k
+    )
+    per_query = [_memories_from_results(results, q) for q in range(len(args.queries))]
+
+    if not args.fuse:
+        return {
+            "queries": args.queries,
+            "results": [
+                {"query": query, "results": memories, "count": len(memories)}
+                for query, memories in zip(args.queries, per_query)
+            ],
+        }
+
+    by_id = {}
+    for memories in per_query:
+        for memory in memories:
+            by_id.setdefault(memory["id"], memory)
+    fused = reciprocal_rank_fusion([[m["id"] for m in memories] for memories in per_query])
+    memories = [by_id[doc_id] for doc_id, _ in fused[:args.top_k]]
     return {
-        "query": args.query,
+        "queries": args.queries,
         "results": memories,
         "count": len(memories)
     }
@@ -226,7 +287,9 @@ class RAGIndexInput(BaseModel):
 def rag_index_handler(args: RAGIndexInput) -> Dict[str, Any]:
     collection = get_rag_collection()
     
-    doc_id = str(uuid.uuid4())
+    # 같은 논문을 다시 인덱싱하면 덮어쓰도록 제목/출처로 고정 ID 생성
+    key = f"{args.source}|{args.title}".encode("utf-8")
+    doc_id = f"abstract:{hashlib.blake2b(key, digest_size=16).hexdigest()}"
     
     metadata = {
         "title": args.title,
@@ -235,11 +298,13 @@ def rag_index_handler(args: RAGIndexInput) -> Dict[str, Any]:
         "indexed_at": datetime.now().isoformat()
     }
     
-    collection.add(
+    collection.upsert(
         ids=[doc_id],
         documents=[args.abstract],
         metadatas=[metadata]
     )
+    get_bm25_index().upsert([doc_id], [args.abstract], [args.title], [args.source])
+    bump_rag_version()
     
     return {
         "status": "success",
@@ -255,7 +320,16 @@ def rag_index_handler(args: RAGIndexInput) -> Dict[str, Any]:
 
 class RAGSearchInput(BaseModel):
     query: str = Field(..., description="검색 질의")
-    top_k: int = Field(5, ge=1, le=10, description="반환할 결과 수 (1~10, 기본값 5)")
+    top_k: int = Field(5, ge=1, le=10, description="반환할 논문 수 (1~10, 기본값 5, 같은 논문의 청크는 하나로 합침)")
+    mode: str = Field(
+        "hybrid",
+        pattern=r"^(hybrid|dense)$",
+        description="hybrid: 키워드(BM25) + 벡터 검색 결합 (정확한 제목/약어/저자명에 강함), dense: 벡터 검색만",
+    )
+    year_from: int | None = Field(None, ge=1900, description="출판 연도 하한 (포함)")
+    year_to: int | None = Field(None, ge=1900, description="출판 연도 상한 (포함)")
+    min_citations: int = Field(0, ge=0, description="최소 인용수")
+    source: str | None = Field(None, description="출처 (인덱싱할 때 저장된 source 값과 정확히 일치하는 것만)")
 
     @field_validator("query")
     @classmethod
@@ -265,43 +339,183 @@ class RAGSearchInput(BaseModel):
         return v
 
 
+def _build_where(args: RAGSearchInput) -> Dict[str, Any] | None:
+    """
+    검색 필터 → Chroma where 절 (필터가 없으면 None)
+    연도를 모르는 청크는 year 필드가 없으므로 연도 필터에 걸리지 않음
+    """
+    conditions = []
+    if args.year_from is not None:
+        conditions.append({"year": {"$gte": args.year_from}})
+    if args.year_to is not None:
+        conditions.append({"year": {"$lte": args.year_to}})
+    if args.min_citations > 0:
+        conditions.append({"citationCount": {"$gte": args.min_citations}})
+    if args.source:
+        conditions.append({"source": args.source})
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+# 청크가 한 논문에 몰려 서로 다른 논문이 top_k개보다 적으면 후보를 이만큼까지 늘려서 다시 검색
+RAG_MAX_FETCH_K = 200
+
+# 검색 결과 캐시: (정규화 질의, top_k, mode, Collection 버전) → 결과
+RAG_CACHE_SIZE = int(os.environ.get("RAG_CACHE_SIZE", "256"))
+RAG_CACHE_TTL = float(os.environ.get("RAG_CACHE_TTL", "600"))  # 초, 0이면 만료 없음
+
+_rag_cache = LRUCache(maxsize=RAG_CACHE_SIZE, ttl=RAG_CACHE_TTL or None)
+
+
+def configure_rag_cache(maxsize: int = RAG_CACHE_SIZE, ttl: float | None = RAG_CACHE_TTL) -> None:
+    """
+    검색 결과 캐시 크기 / TTL 변경 (maxsize=0이면 캐시 사용 안 함)
+    """
+    global _rag_cache
+    _rag_cache = LRUCache(maxsize=maxsize, ttl=ttl or None)
+
+
+def get_rag_cache_stats() -> Dict[str, Any]:
+    """
+    검색 결과 캐시 통계 (size / hits / misses / hit_rate)
+    """
+    return _rag_cache.stats()
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _to_paper(doc: str, doc_id: str, meta: Dict[str, Any] | None) -> Dict[str, Any]:
+    paper = {
+        "abstract": doc,
+        "text": doc,
+        "id": doc_id,
+    }
+    if meta:
+        paper["title"] = meta.get("title")
+        paper["authors"] = meta.get("authors", "").split(",") if meta.get("authors") else []
+        paper["source"] = meta.get("source")
+        paper["indexed_at"] = meta.get("indexed_at")
+        if meta.get("paperId"):
+            paper["paper_id"] = meta["paperId"]
+        if isinstance(meta.get("year"), int):
+            paper["year"] = meta["year"]
+        if meta.get("citationCount") is not None:
+            paper["citation_count"] = meta["citationCount"]
+    return paper
+
+
+def _paper_key(paper: Dict[str, Any]) -> str:
+    return paper.get("paper_id") or paper.get("source") or paper["id"]
+
+
+def _collapse_papers(papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    같은 논문(paperId / 출처)의 청크 중 순위가 가장 높은 것만 남김 (순서 유지)
+    """
+    seen = set()
+    collapsed = []
+    for paper in papers:
+        key = _paper_key(paper)
+        if key not in seen:
+            seen.add(key)
+            collapsed.append(paper)
+    return collapsed
+
+
+def _papers_from_results(results: Dict[str, Any], q: int) -> List[Dict[str, Any]]:
+    """
+    collection.query 결과에서 q번째 질의의 논문(청크) 목록
+    """
+    papers = []
+    if results["documents"] and results["documents"][q]:
+        for i, doc in enumerate(results["documents"][q]):
+            meta = results["metadatas"][q][i] if results["metadatas"] and results["metadatas"][q] else None
+            paper = _to_paper(doc, results["ids"][q][i] if results["ids"] else None, meta)
+            
+            if results["distances"] and results["distances"][q]:
+                paper["distance"] = results["distances"][q][i]
+            
+            papers.append(paper)
+    return papers
+
+
 def rag_search_handler(args: RAGSearchInput) -> Dict[str, Any]:
     
     print(f"[RAG Search] 입력 쿼리: '{args.query}'") 
     
+    cache_key = (
+        _normalize_query(args.query), args.top_k, args.mode,
+        args.year_from, args.year_to, args.min_citations, args.source,
+        get_rag_version(),
+    )
+    if _rag_cache.maxsize > 0:
+        cached = _rag_cache.get(cache_key)
+        if cached is not None:
+            print(f"[RAG Search] 캐시 hit")
+            # 호출하는 쪽에서 결과를 수정해도 캐시가 바뀌지 않도록 복사본 반환
+            result = copy.deepcopy(cached)
+            result["query"] = args.query
+            return result
+    result = _rag_search(args)
+    if _rag_cache.maxsize > 0:
+        _rag_cache.put(cache_key, copy.deepcopy(result))
+    return result
+
+
+def _rag_search(args: RAGSearchInput) -> Dict[str, Any]:
     collection = get_rag_collection()
+    # 연도 / 인용수 / 출처 필터는 Chroma에서 처리 (조건에 맞는 청크만 검색)
+    where = _build_where(args)
     
     # 초기 검색: top_k의 2배 가져오기
+    # (청크 단위로 저장되어 있으므로 서로 다른 논문이 top_k개 이상 나올 때까지 2배씩 늘림)
     initial_k = min(args.top_k * 2, 20)
+    fetch_k = initial_k
+    while True:
+        results = collection.query(
+            query_texts=[args.query],
+            n_results=fetch_k,
+            where=where
+        )
+        chunks = _papers_from_results(results, 0)
+        papers = _collapse_papers(chunks)
+        if len(papers) >= args.top_k or len(chunks) < fetch_k or fetch_k >= RAG_MAX_FETCH_K:
+            break
+        fetch_k = min(fetch_k * 2, RAG_MAX_FETCH_K)
     
-    results = collection.query(
-        query_texts=[args.query],
-        n_results=initial_k
-    )
+    # 유사도 임계값 0.5
+    dense_ok = bool(papers) and min(p.get("distance", 1.0) for p in papers) <= 0.5
     
-    papers = []
-    if results["documents"] and results["documents"][0]:
-        for i, doc in enumerate(results["documents"][0]):
-            paper = {
-                "abstract": doc,
-                "text": doc,  # ← 이 줄 추가
-                "id": results["ids"][0][i] if results["ids"] else None,
-            }
-            
-            if results["metadatas"] and results["metadatas"][0]:
-                meta = results["metadatas"][0][i]
-                paper["title"] = meta.get("title")
-                paper["authors"] = meta.get("authors", "").split(",") if meta.get("authors") else []
-                paper["source"] = meta.get("source")
-                paper["indexed_at"] = meta.get("indexed_at")
-            
-            if results["distances"] and results["distances"][0]:
-                paper["distance"] = results["distances"][0][i]
-            
-            papers.append(paper)
+    # 하이브리드: BM25 후보를 RRF로 합침
+    keyword_hits = []
+    if args.mode == "hybrid":
+        keyword_hits = [doc_id for doc_id, _ in get_bm25_index().search(args.query, k=fetch_k)]
     
-    # 유사도 임계값 0.5
-    if not papers or min(p.get("distance", 1.0) for p in papers) > 0.5:
+    if keyword_hits:
+        by_id = {p["id"]: p for p in chunks}
+        missing = [doc_id for doc_id in keyword_hits if doc_id not in by_id]
+        if missing:
+            fetched = collection.get(ids=missing, where=where)
+            for i, doc_id in enumerate(fetched["ids"]):
+                meta = fetched["metadatas"][i] if fetched["metadatas"] else None
+                by_id[doc_id] = _to_paper(fetched["documents"][i], doc_id, meta)
+        # 필터 조건에 맞지 않는 키워드 결과 제외
+        keyword_hits = [doc_id for doc_id in keyword_hits if doc_id in by_id]
+    
+    if keyword_hits:
+        fused = reciprocal_rank_fusion([[p["id"] for p in chunks], keyword_hits])
+        papers = _collapse_papers([by_id[doc_id] for doc_id, _ in fused if doc_id in by_id])
+        print(f"[RAG Search] 하이브리드 - 벡터 {len(chunks)}개 + BM25 {len(keyword_hits)}개 → 논문 {len(papers)}개")
+    
+    # 논문당 청크 1개만 리랭킹
+    papers = papers[:initial_k]
+    
+    if not papers or not (dense_ok or keyword_hits):
         return {
             "query": args.query,
             "results": [],
@@ -313,6 +527,16 @@ def rag_search_handler(args: RAGSearchInput) -> Dict[str, Any]:
     # Cross-Encoder 리랭킹
     papers = rerank_results(args.query, papers, top_k=args.top_k)
     
+    # 벡터 유사도가 낮아 키워드로만 찾은 경우, 리랭킹 점수로 관련성 확인
+    if not dense_ok and (not papers or papers[0].get("relevance_score", 0) < 0.5):
+        return {
+            "query": args.query,
+            "results": [],
+            "count": 0,
+            "reranked": True,
+            "reason": "신뢰도 낮음"
+        }
+    
     for paper in papers:
         paper.pop('text', None)
     return {
@@ -322,6 +546,104 @@ def rag_search_handler(args: RAGSearchInput) -> Dict[str, Any]:
         "reranked": True
     }
 
+class RAGMultiSearchInput(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=10, description="검색 질의 목록 (관심 분야 여러 개 등)")
+    top_k: int = Field(5, ge=1, le=10, description="반환할 결과 수 (1~10, 기본값 5)")
+    fuse: bool = Field(True, description="True면 질의별 결과를 RRF로 합쳐 하나의 목록으로 반환")
+
+    @field_validator("queries")
+    @classmethod
+    def queries_not_empty(cls, v: List[str]) -> List[str]:
+        v = [q for q in v if q.strip()]
+        if not v:
+            raise ValueError("queries에 공백이 아닌 문자열이 하나 이상 있어야 합니다.")
+        return v
+
+
+def _rerank_by_best_query(queries: List[str], papers: List[Dict[str, Any]], best_query: Dict[str, int], top_k: int) -> List[Dict[str, Any]]:
+    """
+    각 후보를 가장 가까웠던 질의와 짝지어 리랭킹 (후보당 Cross-Encoder 1회)
+    """
+    groups = {}
+    for paper in papers:
+        groups.setdefault(best_query[paper["id"]], []).append(paper)
+    reranked = []
+    for q, group in groups.items():
+        for paper in rerank_results(queries[q], group):
+            paper["matched_query"] = queries[q]
+            reranked.append(paper)
+    reranked.sort(key=lambda p: p.get("relevance_score", 0), reverse=True)
+    return reranked[:top_k]
+
+
+def rag_multi_search_handler(args: RAGMultiSearchInput) -> Dict[str, Any]:
+    """
+    여러 질의를 한 번에 임베딩해서 collection.query 한 번으로 검색 (벡터 검색만)
+
+    fuse=True: 질의별 순위를 RRF로 합친 뒤 리랭킹 → 하나의 목록
+    fuse=False: 질의마다 따로 리랭킹한 목록
+    """
+    print(f"[RAG Multi Search] 입력 쿼리 {len(args.queries)}개: {args.queries}")
+    
+    collection = get_rag_collection()
+    initial_k = min(args.top_k * 2, 20)
+    
+    results = collection.query(
+        query_texts=args.queries,
+        n_results=initial_k
+    )
+    per_query = []
+    for q in range(len(args.queries)):
+        papers = _papers_from_results(results, q)
+        # 질의마다 유사도 임계값 0.5 적용
+        if papers and min(p.get("distance", 1.0) for p in papers) <= 0.5:
+            per_query.append((q, papers))
+        else:
+            per_query.append((q, []))
+    
+    if not args.fuse:
+        outputs = []
+        for q, papers in per_query:
+            if papers:
+                # 같은 논문의 청크가 여러 개 나오지 않도록 논문 단위로 묶은 뒤 리랭킹
+                papers = rerank_results(args.queries[q], _collapse_papers(papers), top_k=args.top_k)
+                for paper in papers:
+                    paper.pop('text', None)
+            outputs.append({"query": args.queries[q], "results": papers, "count": len(papers)})
+        return {
+            "queries": args.queries,
+            "results": outputs,
+            "reranked": True
+        }
+    
+    by_id, best_query = {}, {}
+    for q, papers in per_query:
+        for paper in papers:
+            if paper["id"] not in by_id or paper.get("distance", 1.0) < by_id[paper["id"]].get("distance", 1.0):
+                by_id[paper["id"]] = paper
+                best_query[paper["id"]] = q
+    fused = reciprocal_rank_fusion([[p["id"] for p in papers] for _, papers in per_query if papers])
+    papers = _collapse_papers([by_id[doc_id] for doc_id, _ in fused])[:initial_k]
+    
+    if not papers:
+        return {
+            "queries": args.queries,
+            "results": [],
+            "count": 0,
+            "reranked": False,
+            "reason": "신뢰도 낮음"
+        }
+    
+    papers = _rerank_by_best_query(args.queries, papers, best_query, args.top_k)
+    for paper in papers:
+        paper.pop('text', None)
+    return {
+        "queries": args.queries,
+        "results": papers,
+        "count": len(papers),
+        "reranked": True
+    }
+
 # -------------------------------
 # 4. Semantic Scholar 
 #    논문 검색 툴
@@ -14,13 +14,17 @@ from .tool_definitions import (
     # Memory
     MemoryWriteInput,
     MemoryReadInput,
+    MemoryMultiReadInput,
     memory_write_handler,
     memory_read_handler,
+    memory_multi_read_handler,
     # RAG
     RAGIndexInput,
     RAGSearchInput,
+    RAGMultiSearchInput,
     rag_index_handler,
     rag_search_handler,
+    rag_multi_search_handler,
     # Semantic Scholar
     SemanticScholarSearchInput,
     semantic_scholar_search_handler,
@@ -126,6 +130,16 @@ def register_all_tools(registry: ToolRegistry) -> None:
             handler=memory_read_handler,
         )
     )
+
+    # 3-1. Memory Multi Read
+    registry.register_tool(
+        ToolSpec(
+            name="memory_multi_read",
+            description="여러 질의로 메모리를 한 번에 검색합니다. 관심사 여러 개를 동시에 찾을 때 memory_read를 여러 번 부르는 대신 사용합니다.",
+            input_model=MemoryMultiReadInput,
+            handler=memory_multi_read_handler,
+        )
+    )
     
     # 4. RAG Index
     registry.register_tool(
@@ -141,12 +155,22 @@ def register_all_tools(registry: ToolRegistry) -> None:
     registry.register_tool(
         ToolSpec(
             name="rag_search",
-            description="인덱싱된 논문 초록에서 유사한 논문을 검색합니다. 관련 연구를 찾을 때 사용합니다.",
+            description="인덱싱된 논문 초록에서 유사한 논문을 검색합니다. 관련 연구를 찾을 때 사용합니다. 출판 연도 범위와 최소 인용수로 거를 수 있습니다.",
             input_model=RAGSearchInput,
             handler=rag_search_handler,
         )
     )
 
+    # 5-1. RAG Multi Search
+    registry.register_tool(
+        ToolSpec(
+            name="rag_multi_search",
+            description="여러 질의로 인덱싱된 논문을 한 번에 검색합니다. 관심 분야 여러 개의 관련 논문을 찾을 때 rag_search를 여러 번 부르는 대신 사용합니다.",
+            input_model=RAGMultiSearchInput,
+            handler=rag_multi_search_handler,
+        )
+    )
+
     # 6. Semantic Scholar Search
     registry.register_tool(
         ToolSpec(
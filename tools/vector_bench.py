@@ -0,0 +1,167 @@
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+TRANSPOTER_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TRANSPOTER_ROOT))
+
+from tools.chroma_client import (
+    get_chroma_collection, get_memmap_collection, get_embedding_function, export_to_memmap,
+)
+from tools.vector_store import normalize, exact_top_k, space_scores
+from ingestion.benchmark import write_report
+
+
+def _percentile_ms(values, q):
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+
+def _latency(search, queries):
+    """
+    질의 하나씩 검색했을 때의 지연 시간 (p50 / p95 / mean, ms)
+    """
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        search(q[None, :])
+        latencies.append(time.perf_counter() - t0)
+    return {
+        "p50_ms": _percentile_ms(latencies, 0.5),
+        "p95_ms": _percentile_ms(latencies, 0.95),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+    }
+
+
+def _recall(found_ids, truth_ids):
+    hits = [len(set(found) & set(truth)) / len(truth) for found, truth in zip(found_ids, truth_ids) if truth]
+    return round(sum(hits) / len(hits), 4) if hits else None
+
+
+def load_corpus(name: str):
+    """
+    Chroma Collection의 ID / 정규화된 fp32 임베딩 / 원래 벡터 길이 / 문서 전체
+    """
+    collection = get_chroma_collection(name)
+    ids, embeddings, documents = [], [], []
+    total = collection.count()
+    for offset in range(0, total, 1000):
+        page = collection.get(limit=1000, offset=offset, include=["embeddings", "documents"])
+        ids.extend(page["ids"])
+        embeddings.extend(page["embeddings"])
+        documents.extend(page["documents"])
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return ids, normalize(embeddings), np.linalg.norm(embeddings, axis=1), documents
+
+
+def sample_queries(documents, n: int, seed: int = 0):
+    """
+    저장된 청크 앞부분을 질의로 사용 (실제 질의와 비슷한 길이)
+    """
+    rng = random.Random(seed)
+    picked = rng.sample(documents, min(n, len(documents)))
+    return [" ".join(doc.split()[:20]) for doc in picked]
+
+
+def run(name: str, dtypes, n_queries: int, k: int, seed: int, build: bool, ivfpq: bool = False, nprobes=(1, 4, 16, 64)):
+    if build:
+        for dtype in dtypes:
+            print(f"[VectorBench] Chroma → memmap ({dtype}) 복사")
+            export_to_memmap(dtype, names=(name,))
+
+    ids, corpus, norms, documents = load_corpus(name)
+    print(f"[VectorBench] {name}: {len(ids)}개 벡터, 차원 {corpus.shape[1]}")
+    # 질의는 정규화하지 않고 넘김 (l2 / ip 공간의 distance는 벡터 길이에 따라 달라짐)
+    queries = np.asarray(get_embedding_function()(sample_queries(documents, n_queries, seed)), dtype=np.float32)
+
+    # 정답: Collection의 distance 공간 기준 fp32 전수 검색
+    chroma = get_chroma_collection(name)
+    space = (chroma.metadata or {}).get("hnsw:space", "l2")
+    query_norms = np.linalg.norm(queries, axis=1)
+    transform = lambda cosines, rows: space_scores(cosines, query_norms, norms[rows], space)
+    rows, _ = exact_top_k(normalize(queries), [(0, corpus)], min(k, len(ids)), transform=transform)
+    truth = [[ids[r] for r in q_rows] for q_rows in rows]
+
+    report = {
+        "collection": name,
+        "vectors": len(ids),
+        "dim": int(corpus.shape[1]),
+        "queries": len(queries),
+        "k": k,
+        "space": space,
+        "backends": {},
+    }
+
+    chroma_search = lambda q: chroma.query(query_embeddings=q.tolist(), n_results=k)
+    found = chroma_search(queries)["ids"]
+    report["backends"]["chroma"] = {
+        "recall_at_k": _recall(found, truth),
+        "latency": _latency(chroma_search, queries),
+        "bytes_per_vector": corpus.shape[1] * 4,
+    }
+
+    for dtype in dtypes:
+        store = get_memmap_collection(name, dtype)
+        if store.count() == 0:
+            print(f"[VectorBench] memmap ({dtype}) 비어 있음 - --build 로 먼저 복사하세요")
+            continue
+        store.use_ann(False)
+        n = max(store.count(), 1)
+        # 저장 크기(벡터 + int8 scale + 원래 길이) + 프로세스 힙에 올라가는 검색용 상태(alive 마스크 등)
+        stored_bytes = corpus.shape[1] * (2 if dtype == "fp16" else 1) + (4 if dtype == "int8" else 0) + 4
+        search = lambda q: store.query(query_embeddings=q, n_results=k)
+        found = search(queries)["ids"]
+        t0 = time.perf_counter()
+        search(queries)
+        batch_seconds = time.perf_counter() - t0
+        report["backends"][f"memmap_{dtype}"] = {
+            "recall_at_k": _recall(found, truth),
+            "latency": _latency(search, queries),
+            "batch_queries_per_sec": round(len(queries) / batch_seconds, 1),
+            "bytes_per_vector": round(stored_bytes + store.heap_bytes() / n, 2),
+            "heap_bytes_per_vector": round(store.heap_bytes() / n, 2),
+        }
+
+        if not ivfpq:
+            continue
+        # IVF-PQ: 같은 저장소 위에 인덱스를 만들고 nprobe별 recall / 지연 시간 측정
+        index = store.build_ann()
+        for nprobe in nprobes:
+            store.use_ann(nprobe=nprobe)
+            found = search(queries)["ids"]
+            report["backends"][f"ivfpq_{dtype}_nprobe{nprobe}"] = {
+                "recall_at_k": _recall(found, truth),
+                "latency": _latency(search, queries),
+                "nlist": index.nlist,
+                "rerank": index.rerank,
+                # 검색 경로에서 훑는 PQ 코드 + 역리스트 + 힙 상태 (재계산용 벡터는 memmap에서 후보만 읽음)
+                "bytes_per_vector": round(index.bytes_per_vector + store.heap_bytes() / n, 2),
+                "heap_bytes_per_vector": round(store.heap_bytes() / n, 2),
+            }
+        store.use_ann(False)
+
+    for backend, result in report["backends"].items():
+        print(f"[VectorBench] {backend}: recall@{k} {result['recall_at_k']}, "
+              f"p50 {result['latency']['p50_ms']}ms, p95 {result['latency']['p95_ms']}ms")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chroma vs 메모리 맵 (exact / IVF-PQ) 벡터 검색 지연 시간 / recall 비교")
+    parser.add_argument("--collection", default="papers", help="비교할 Collection 이름")
+    parser.add_argument("--dtype", nargs="+", default=["fp16", "int8"], choices=["fp16", "int8"], help="memmap 저장 형식")
+    parser.add_argument("--queries", type=int, default=200, help="질의 수")
+    parser.add_argument("--k", type=int, default=10, help="recall@k의 k")
+    parser.add_argument("--seed", type=int, default=0, help="질의 샘플 seed")
+    parser.add_argument("--build", action="store_true", help="Chroma에서 memmap 저장소로 먼저 복사")
+    parser.add_argument("--ivfpq", action="store_true", help="memmap 저장소마다 IVF-PQ 인덱스를 만들고 nprobe별로 측정")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64], help="측정할 nprobe 값들")
+    parser.add_argument("--report", type=Path, default=Path("vector_benchmark.json"), help="JSON 리포트 경로")
+    args = parser.parse_args()
+
+    report = run(args.collection, args.dtype, args.queries, args.k, args.seed, args.build, args.ivfpq, args.nprobe)
+    write_report(args.report, report)
@@ -0,0 +1,642 @@
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ivfpq import DEFAULT_SUBDIM, TRAIN_SAMPLE, IVFPQIndex, ids_digest
+
+# 한 번에 행렬곱하는 벡터 수 (fp32로 풀었을 때 약 25MB)
+SEARCH_BLOCK = 16384
+DTYPES = ("fp16", "int8")
+# SQLite IN (...)에 한 번에 넣는 값 수
+SQL_BATCH = 500
+# distance 공간 (Chroma hnsw:space와 같은 의미, Chroma 기본값은 l2)
+SPACES = ("l2", "cosine", "ip")
+
+
+def where_to_sql(where: Optional[Dict[str, Any]], column: str = "metadata") -> Tuple[str, List[Any]]:
+    """
+    Chroma where 절 → SQLite 조건식 (JSON 메타데이터 컬럼에 json_extract)
+    ($and / $or / $eq / $ne / $gt / $gte / $lt / $lte / $in / $nin)
+    """
+    if not where:
+        return "1", []
+    clauses, params = [], []
+    for key, cond in where.items():
+        if key in ("$and", "$or"):
+            parts = [where_to_sql(c, column) for c in cond]
+            if not parts:
+                clauses.append("1" if key == "$and" else "0")
+                continue
+            clauses.append("(" + f" {key[1:].upper()} ".join(sql for sql, _ in parts) + ")")
+            for _, p in parts:
+                params.extend(p)
+            continue
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        path = f'$."{key}"'
+        value = f"json_extract({column}, ?)"
+        for op, target in cond.items():
+            if op == "$eq":
+                clauses.append(f"{value} = ?")
+                params.extend([path, target])
+            elif op == "$ne":
+                # 필드가 없으면 불일치가 아니라 '다름'으로 봄
+                clauses.append(f"({value} IS NULL OR {value} != ?)")
+                params.extend([path, path, target])
+            elif op in ("$in", "$nin"):
+                if not target:
+                    clauses.append("0" if op == "$in" else "1")
+                    continue
+                placeholders = ",".join("?" * len(target))
+                if op == "$in":
+                    clauses.append(f"{value} IN ({placeholders})")
+                    params.extend([path, *target])
+                else:
+                    clauses.append(f"({value} IS NULL OR {value} NOT IN ({placeholders}))")
+                    params.extend([path, path, *target])
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                # 필드가 없거나 타입이 다르면 대소 비교는 불일치 (Chroma와 같음)
+                kinds = "('text')" if isinstance(target, str) else "('integer', 'real')"
+                symbol = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[op]
+                clauses.append(f"(json_type({column}, ?) IN {kinds} AND {value} {symbol} ?)")
+                params.extend([path, path, target])
+            else:
+                raise ValueError(f"지원하지 않는 where 연산자: {op}")
+    return "(" + " AND ".join(clauses) + ")", params
+
+
+def normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def space_scores(cosines: np.ndarray, query_norms: np.ndarray, norms: np.ndarray, space: str) -> np.ndarray:
+    """
+    코사인 (nq, b) → space의 distance와 순서가 같은 점수 (클수록 가까움)
+    query_norms (nq,) / norms (b,): 정규화 전 벡터 길이
+      cosine: cos, ip: |x|·cos, l2: |x|·cos - |x|² / (2|q|)
+    """
+    if space == "cosine":
+        return cosines
+    if space == "ip":
+        return cosines * norms[None, :]
+    return cosines * norms[None, :] - (norms ** 2)[None, :] / (2 * np.maximum(query_norms, 1e-12)[:, None])
+
+
+def space_distances(scores: np.ndarray, query_norm: float, space: str) -> np.ndarray:
+    """
+    space_scores의 점수 → distance (cosine: 1 - cos, ip: 1 - q·x, l2: |q - x|²)
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if space == "cosine":
+        return 1.0 - scores
+    if space == "ip":
+        return 1.0 - query_norm * scores
+    query_norm = max(query_norm, 1e-12)
+    return np.maximum(query_norm ** 2 - 2 * query_norm * scores, 0.0)
+
+
+def exact_top_k(queries: np.ndarray, blocks, k: int, mask: Optional[np.ndarray] = None, transform: Callable = None):
+    """
+    정규화된 질의 (nq, d)와 벡터 블록들의 내적 상위 k개
+
+    blocks: (시작 행, fp32 블록) 이터레이터
+    transform: (코사인 (nq, b), 행 번호 (b,)) → 순위 점수 (없으면 코사인 그대로)
+    Returns: (행 번호 (nq, k'), 점수 (nq, k')) - 점수 내림차순
+    """
+    nq = len(queries)
+    best_rows = np.zeros((nq, 0), dtype=np.int64)
+    best_scores = np.zeros((nq, 0), dtype=np.float32)
+    for start, block in blocks:
+        scores = queries @ block.T
+        if transform is not None:
+            scores = transform(scores, np.arange(start, start + len(block)))
+        if mask is not None:
+            scores[:, ~mask[start:start + len(block)]] = -np.inf
+        rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+        scores = np.concatenate([best_scores, scores], axis=1)
+        rows = np.concatenate([best_rows, rows], axis=1)
+        if scores.shape[1] > k:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, top, axis=1)
+            rows = np.take_along_axis(rows, top, axis=1)
+        best_scores, best_rows = scores, rows
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+class MemmapCollection:
+    """
+    Chroma Collection과 같은 인터페이스의 메모리 맵 벡터 저장소
+
+    - 벡터: 정규화 후 fp16 또는 int8(행마다 scale)로 vectors.bin에 append → np.memmap으로 읽음
+      (여러 프로세스가 같은 파일을 페이지 캐시로 공유)
+    - ID / 문서 / 메타데이터: rows.sqlite3 (ID 조회 / where 필터도 SQLite에서)
+      프로세스 메모리에는 행마다 alive 1바이트만 둠 → 수백만 청크에서도 벡터 / PQ 코드보다 작음
+    - 검색: 블록 단위 정확한 내적을 원본 Collection의 공간(space) distance로 환산해서 순위 / distance 계산
+      → 백엔드를 바꿔도 결과 순서와 distance 기준값의 의미가 같음
+      (l2: |q|² + |x|² - 2q·x, ip: 1 - q·x, cosine: 1 - cos / 원래 벡터 길이는 norms.f32에 저장)
+      use_ann()을 켜면 IVF-PQ 인덱스로 (코사인 기준) 후보를 좁힌 뒤 정확히 다시 계산
+      (인덱스를 만든 뒤 추가된 행은 정확 검색으로 함께 훑음)
+    - 여러 프로세스가 같이 써도 됨: 쓰기는 lock 파일에 배타 flock을 잡고 행 개수를 다시 읽은 뒤
+      벡터 append + 행 기록까지 한 번에, 다시 로드할 때는 공유 flock
+      다른 프로세스의 변경은 다음 읽기 때 자동으로 다시 로드
+    """
+
+    def __init__(self, path: Path, embedding_function: Callable = None, dtype: str = "fp16", space: str = "l2"):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype은 {DTYPES} 중 하나여야 합니다: {dtype}")
+        if space not in SPACES:
+            raise ValueError(f"space는 {SPACES} 중 하나여야 합니다: {space}")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embedding_function = embedding_function
+        self._lock = threading.RLock()
+        self._vectors_path = self.path / "vectors.bin"
+        self._scales_path = self.path / "scales.f32"
+        self._norms_path = self.path / "norms.f32"
+        self._meta_path = self.path / "meta.json"
+        self._ann_path = self.path / "ivfpq"
+        self.ann = None
+        self._lock_file = open(self.path / "lock", "a+b")
+        self._lock_depth = 0
+
+        self._conn = sqlite3.connect(str(self.path / "rows.sqlite3"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "row INTEGER PRIMARY KEY, id TEXT NOT NULL, document TEXT, metadata TEXT, alive INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS rows_id ON rows (id)")
+        self._conn.commit()
+
+        # 이미 만들어진 저장소는 저장된 dtype / space를 따름
+        self.dtype = dtype
+        self.space = space
+        self.dim = None
+        self._data_version = None
+        self._load()
+
+    # ---------- 로드 / 저장 ----------
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True):
+        """
+        프로세스 간 잠금 (lock 파일에 flock, self._lock 안에서만 호출)
+        이미 잡고 있으면 그대로 씀 → 쓰기 중에 부르는 _load는 배타 잠금을 유지
+        """
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        self._lock_depth = 1
+        try:
+            yield
+        finally:
+            self._lock_depth = 0
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        # 쓰는 프로세스가 파일을 자르거나 지우는 도중에 매핑하지 않도록 공유 잠금
+        with self._file_lock(exclusive=False):
+            if self._meta_path.exists():
+                with open(self._meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                self.dtype, self.dim = meta["dtype"], meta["dim"]
+                # space가 없는 예전 저장소는 1 - cosine으로 저장됐던 것
+                self.space = meta.get("space", "cosine")
+            else:
+                # 다른 프로세스가 clear() 했으면 다음 upsert의 차원을 새로 따름
+                self.dim = None
+            # 벡터는 행 기록보다 먼저 쓰므로, 중간에 죽었으면 벡터 파일 쪽이 더 길 수 있음
+            self._n = self._conn.execute("SELECT coalesce(max(row) + 1, 0) FROM rows").fetchone()[0]
+            self._alive = np.zeros(self._n, dtype=bool)
+            cursor = self._conn.execute("SELECT row FROM rows WHERE alive = 1")
+            while True:
+                chunk = cursor.fetchmany(65536)
+                if not chunk:
+                    break
+                self._alive[[r[0] for r in chunk]] = True
+            self._map()
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _map(self) -> None:
+        self._vectors = None
+        self._scales = None
+        self._norms = None
+        if not self._n:
+            return
+        vec_dtype = np.float16 if self.dtype == "fp16" else np.int8
+        self._vectors = np.memmap(self._vectors_path, dtype=vec_dtype, mode="r", shape=(self._n, self.dim))
+        if self.dtype == "int8":
+            self._scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(self._n,))
+        if self._norms_path.exists():
+            self._norms = np.memmap(self._norms_path, dtype=np.float32, mode="r", shape=(self._n,))
+
+    def _refresh(self) -> None:
+        # 다른 프로세스가 커밋하면 data_version이 바뀜
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._load()
+
+    def _iter_ids(self, end: int = None) -> Iterator[str]:
+        """
+        행 순서대로 ID (IVF-PQ 인덱스의 digest 계산용, 메모리에 모으지 않음)
+        """
+        end = self._n if end is None else end
+        for (doc_id,) in self._conn.execute("SELECT id FROM rows WHERE row < ? ORDER BY row", (end,)):
+            yield doc_id
+
+    def _rows_of(self, ids: Sequence[str]) -> Dict[str, int]:
+        found = {}
+        for start in range(0, len(ids), SQL_BATCH):
+            batch = list(ids[start:start + SQL_BATCH])
+            found.update(self._conn.execute(
+                f"SELECT id, row FROM rows WHERE alive = 1 AND id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+        return found
+
+    def _fetch(self, rows: Sequence[int]) -> Dict[int, Tuple[str, Optional[str], Dict[str, Any]]]:
+        """
+        행 번호 → (ID, 문서, 메타데이터)
+        """
+        found = {}
+        rows = [int(r) for r in rows]
+        for start in range(0, len(rows), SQL_BATCH):
+            batch = rows[start:start + SQL_BATCH]
+            for row, doc_id, document, metadata in self._conn.execute(
+                f"SELECT row, id, document, metadata FROM rows WHERE row IN ({','.join('?' * len(batch))})", batch
+            ):
+                found[row] = (doc_id, document, json.loads(metadata) if metadata else {})
+        return found
+
+    def heap_bytes(self) -> int:
+        """
+        이 프로세스가 힙에 들고 있는 검색용 상태 크기 (memmap으로 공유되는 벡터 / PQ 코드 제외)
+        """
+        total = self._alive.nbytes
+        if self.ann is not None:
+            for array in (self.ann.centroids, self.ann.codebooks, self.ann.codes, self.ann.list_offsets, self.ann.list_rows):
+                if not isinstance(array, np.memmap):
+                    total += array.nbytes
+        return total
+
+    def _encode(self, vectors: np.ndarray):
+        if self.dtype == "fp16":
+            return vectors.astype(np.float16), None
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales
+
+    def _blocks(self, start: int = 0, end: int = None):
+        end = self._n if end is None else end
+        for s in range(start, end, SEARCH_BLOCK):
+            e = min(s + SEARCH_BLOCK, end)
+            block = np.asarray(self._vectors[s:e], dtype=np.float32)
+            if self._scales is not None:
+                block *= self._scales[s:e, None]
+            yield s, block
+
+    def _sample(self, n: int, seed: int = 0) -> np.ndarray:
+        alive = np.flatnonzero(self._alive)
+        rows = np.sort(np.random.default_rng(seed).choice(alive, min(n, len(alive)), replace=False))
+        sample = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self._scales is not None:
+            sample *= self._scales[rows, None]
+        return normalize(sample)
+
+    # ---------- 근사 검색 (IVF-PQ) ----------
+
+    def build_ann(self, nlist: int = None, subdim: int = DEFAULT_SUBDIM, train_size: int = TRAIN_SAMPLE, seed: int = 0) -> IVFPQIndex:
+        """
+        현재 저장된 벡터로 IVF-PQ 인덱스를 학습 / 저장하고 사용하도록 설정
+        """
+        # 학습 / 코드 계산 중에는 다른 프로세스가 행을 바꾸지 못하도록 공유 잠금
+        with self._lock, self._file_lock(exclusive=False):
+            self._refresh()
+            if not self._n:
+                raise RuntimeError("빈 저장소에는 인덱스를 만들 수 없습니다.")
+            nlist = nlist or int(4 * np.sqrt(self._n))
+            index = IVFPQIndex.train(self._sample(train_size, seed), nlist, subdim, seed)
+            index.add_blocks(self._blocks(), self._n, self._iter_ids())
+            index.save(self._ann_path)
+            # 저장한 코드 / 역리스트를 memmap으로 다시 열어서 힙에 두지 않음
+            index = IVFPQIndex.load(self._ann_path)
+            self.ann = index
+            print(f"[IVF-PQ] {index.n}개 벡터, 벡터당 {index.bytes_per_vector}바이트 "
+                  f"(원본 fp32 {self.dim * 4}바이트)")
+            return index
+
+    def use_ann(self, enabled: bool = True, nprobe: int = None, rerank: int = None) -> bool:
+        """
+        저장된 IVF-PQ 인덱스 사용 여부 (인덱스가 없거나 행 순서가 바뀌었으면 False)
+        """
+        with self._lock:
+            if not enabled:
+                self.ann = None
+                return False
+            self._refresh()
+            index = self.ann or IVFPQIndex.load(self._ann_path)
+            if index is None or index.n > self._n or index.digest != ids_digest(self._iter_ids(index.n)):
+                print(f"[IVF-PQ] 인덱스 없음 또는 오래됨 - 정확 검색 사용 ({self._ann_path})")
+                self.ann = None
+                return False
+            if nprobe:
+                index.nprobe = nprobe
+            if rerank:
+                index.rerank = rerank
+            self.ann = index
+            return True
+
+    def _scorer(self, query_norms: np.ndarray) -> Optional[Callable]:
+        """
+        exact_top_k의 transform: 코사인 → 저장소 space의 순위 점수 (cosine이면 None)
+        norms.f32가 없는 예전 저장소는 길이 1로 봄
+        """
+        if self.space == "cosine":
+            return None
+
+        def transform(cosines, rows):
+            norms = np.asarray(self._norms[rows], dtype=np.float32) if self._norms is not None else np.ones(len(rows), dtype=np.float32)
+            return space_scores(cosines, query_norms, norms, self.space)
+        return transform
+
+    def _ann_top_k(self, queries: np.ndarray, k: int, mask: np.ndarray, query_norms: np.ndarray):
+        """
+        IVF-PQ 후보 + 인덱스 이후에 추가된 행을 정확한 점수로 합친 상위 k
+        """
+        n_indexed = self.ann.n
+        all_rows, all_scores = [], []
+        for i, query in enumerate(queries):
+            transform = self._scorer(query_norms[i:i + 1])
+            candidates = self.ann.search(query, k, mask[:n_indexed])
+            rows = np.array(sorted(r for r, _ in candidates), dtype=np.int64)
+            blocks = []
+            if len(rows):
+                vectors = np.asarray(self._vectors[rows], dtype=np.float32)
+                if self._scales is not None:
+                    vectors *= self._scales[rows, None]
+                blocks.append((0, vectors))
+            # 후보 블록의 열 번호 → 실제 행 번호
+            candidate_transform = (lambda s, r: transform(s, rows[r])) if transform is not None else None
+            q_rows, q_scores = exact_top_k(query[None, :], blocks, k, transform=candidate_transform)
+            q_rows = rows[q_rows[0]] if len(rows) else q_rows[0]
+            q_scores = q_scores[0]
+            if n_indexed < self._n:
+                tail_rows, tail_scores = exact_top_k(query[None, :], self._blocks(n_indexed), k, mask, transform)
+                q_rows = np.concatenate([q_rows, tail_rows[0]])
+                q_scores = np.concatenate([q_scores, tail_scores[0]])
+            order = np.argsort(-q_scores, kind="stable")[:k]
+            all_rows.append(q_rows[order])
+            all_scores.append(q_scores[order])
+        width = max((len(r) for r in all_rows), default=0)
+        pad = lambda arrays, fill: np.array([np.concatenate([a, np.full(width - len(a), fill)]) for a in arrays])
+        return pad(all_rows, 0).astype(np.int64), pad(all_scores, -np.inf)
+
+    def _embed_raw(self, texts: Sequence[str]) -> np.ndarray:
+        if self.embedding_function is None:
+            raise RuntimeError("embedding_function 없이 텍스트를 임베딩할 수 없습니다.")
+        return np.asarray(self.embedding_function(list(texts)), dtype=np.float32)
+
+    # ---------- Chroma Collection 인터페이스 ----------
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return int(self._alive.sum())
+
+    def upsert(self, ids: Sequence[str], documents: Sequence[str] = None, metadatas: Sequence[Dict] = None, embeddings=None) -> None:
+        if not ids:
+            return
+        raw = np.asarray(embeddings, dtype=np.float32) if embeddings is not None else self._embed_raw(documents)
+        if raw.ndim == 1:
+            raw = raw[None, :]
+        vectors = normalize(raw)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        # 행 개수를 다시 읽고 벡터 append + 행 기록을 끝낼 때까지 다른 프로세스의 쓰기를 막음
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dtype": self.dtype, "dim": self.dim, "space": self.space}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"임베딩 차원이 다릅니다: {vectors.shape[1]} != {self.dim}")
+
+            # 같은 배치 안에서 ID가 겹치면 마지막 것만 남김
+            last = {doc_id: i for i, doc_id in enumerate(ids)}
+            keep = sorted(last.values())
+            encoded, scales = self._encode(vectors[keep])
+            norms = np.linalg.norm(raw[keep], axis=1).astype(np.float32)
+
+            # 1) 벡터 append (기존 행 개수 위치에서 이어 씀, 죽었던 실행의 찌꺼기는 덮어씀)
+            item = encoded.itemsize * self.dim
+            with open(self._vectors_path, "r+b" if self._vectors_path.exists() else "wb") as f:
+                f.truncate(self._n * item)
+                f.seek(self._n * item)
+                f.write(encoded.tobytes())
+            for path, values in ((self._scales_path, scales), (self._norms_path, norms)):
+                if values is None:
+                    continue
+                with open(path, "r+b" if path.exists() else "wb") as f:
+                    f.truncate(self._n * 4)
+                    f.seek(self._n * 4)
+                    f.write(values.tobytes())
+
+            # 2) 행 기록 (기존 같은 ID는 삭제 표시)
+            new_ids = [ids[i] for i in keep]
+            replaced = list(self._rows_of(new_ids).values())
+            self._conn.executemany("UPDATE rows SET alive = 0 WHERE id = ? AND alive = 1", [(i,) for i in new_ids])
+            self._conn.executemany(
+                "INSERT INTO rows (row, id, document, metadata, alive) VALUES (?, ?, ?, ?, 1)",
+                [
+                    (self._n + j, ids[i], documents[i], json.dumps(metadatas[i], ensure_ascii=False) if metadatas[i] else None)
+                    for j, i in enumerate(keep)
+                ],
+            )
+            self._conn.commit()
+
+            # 3) 메모리 상태도 바뀐 행만 반영 (전체를 다시 읽지 않음)
+            #    자기 연결의 커밋은 data_version을 바꾸지 않으므로 _refresh에서 다시 로드되지 않음
+            self._alive[replaced] = False
+            self._alive = np.concatenate([self._alive, np.ones(len(keep), dtype=bool)])
+            self._n += len(keep)
+            self._map()
+
+    def add(self, ids: Sequence[str], documents: Sequence[str] = None, metadatas: Sequence[Dict] = None, embeddings=None) -> None:
+        self.upsert(ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def delete(self, ids: Sequence[str] = None, where: Dict[str, Any] = None) -> None:
+        if ids is None and not where:
+            return
+        with self._lock, self._file_lock():
+            self._refresh()
+            rows = self._select(ids, where)
+            if not rows:
+                return
+            self._conn.executemany("UPDATE rows SET alive = 0 WHERE row = ?", [(int(r),) for r in rows])
+            self._conn.commit()
+            self._alive[rows] = False
+
+    def _select(self, ids: Sequence[str] = None, where: Dict[str, Any] = None, limit: int = None, offset: int = 0) -> List[int]:
+        """
+        살아있는 행 중 ids / where에 맞는 행 번호 (ids를 주면 그 순서, 아니면 행 순서)
+        """
+        clause, params = where_to_sql(where)
+        if ids is not None:
+            rows_of = self._rows_of(ids)
+            rows = [rows_of[i] for i in dict.fromkeys(ids) if i in rows_of]
+            if where and rows:
+                matched = set()
+                for start in range(0, len(rows), SQL_BATCH):
+                    batch = rows[start:start + SQL_BATCH]
+                    matched.update(r[0] for r in self._conn.execute(
+                        f"SELECT row FROM rows WHERE row IN ({','.join('?' * len(batch))}) AND {clause}", batch + params
+                    ))
+                rows = [r for r in rows if r in matched]
+            return rows[offset:offset + limit] if limit is not None else rows[offset:]
+        sql = f"SELECT row FROM rows WHERE alive = 1 AND {clause} ORDER BY row LIMIT ? OFFSET ?"
+        return [r[0] for r in self._conn.execute(sql, params + [-1 if limit is None else limit, offset])]
+
+    def get(self, ids: Sequence[str] = None, where: Dict[str, Any] = None, limit: int = None, offset: int = 0,
+            include: Sequence[str] = None, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            rows = self._select(ids, where, limit, offset)
+            found = self._fetch(rows)
+            result = {
+                "ids": [found[r][0] for r in rows],
+                "documents": [found[r][1] for r in rows],
+                "metadatas": [found[r][2] for r in rows],
+            }
+            if include and "embeddings" in include:
+                result["embeddings"] = [self.vector(r) for r in rows]
+            return result
+
+    def vector(self, row: int) -> np.ndarray:
+        vector = np.asarray(self._vectors[row], dtype=np.float32)
+        if self._scales is not None:
+            vector = vector * self._scales[row]
+        return vector
+
+    def query(
+        self,
+        query_texts: Sequence[str] = None,
+        query_embeddings=None,
+        n_results: int = 10,
+        where: Dict[str, Any] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        raw = np.asarray(query_embeddings if query_embeddings is not None else self._embed_raw(query_texts), dtype=np.float32)
+        if raw.ndim == 1:
+            raw = raw[None, :]
+        queries = normalize(raw)
+        query_norms = np.linalg.norm(raw, axis=1)
+        with self._lock:
+            self._refresh()
+            if not self._n:
+                empty = [[] for _ in range(len(queries))]
+                return {"ids": empty, "documents": empty, "metadatas": empty, "distances": empty}
+            mask = self._alive
+            if where:
+                mask = np.zeros(self._n, dtype=bool)
+                mask[self._select(where=where)] = True
+            k = min(n_results, self._n)
+            if self.ann is not None:
+                rows, scores = self._ann_top_k(queries, k, mask, query_norms)
+            else:
+                rows, scores = exact_top_k(queries, self._blocks(), k, mask, self._scorer(query_norms))
+            return self._results(rows, scores, query_norms)
+
+    def _results(self, rows: np.ndarray, scores: np.ndarray, query_norms: np.ndarray) -> Dict[str, Any]:
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for q_rows, q_scores, query_norm in zip(rows, scores, query_norms):
+            valid = np.isfinite(q_scores)
+            q_rows = [int(r) for r in q_rows[valid]]
+            found = self._fetch(q_rows)
+            result["ids"].append([found[r][0] for r in q_rows])
+            result["documents"].append([found[r][1] for r in q_rows])
+            result["metadatas"].append([found[r][2] for r in q_rows])
+            result["distances"].append(space_distances(q_scores[valid], float(query_norm), self.space).tolist())
+        return result
+
+    def clear(self) -> None:
+        """
+        모든 행 / 벡터 삭제 (다음 upsert의 임베딩 차원을 새로 따름)
+        """
+        with self._lock, self._file_lock():
+            self._conn.execute("DELETE FROM rows")
+            self._conn.commit()
+            for path in (self._vectors_path, self._scales_path, self._norms_path, self._meta_path):
+                if path.exists():
+                    path.unlink()
+            self.dim = None
+            self.ann = None
+            self._load()
+
+    def compact(self) -> None:
+        """
+        삭제 표시된 행을 실제로 지우고 파일을 다시 씀
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            alive = np.flatnonzero(self._alive)
+            if len(alive) == self._n:
+                return
+            vectors = np.asarray(self._vectors[alive])
+            scales = np.asarray(self._scales[alive]) if self._scales is not None else None
+            norms = np.asarray(self._norms[alive]) if self._norms is not None else None
+            for name, array in ((self._vectors_path, vectors), (self._scales_path, scales), (self._norms_path, norms)):
+                if array is None:
+                    continue
+                tmp_path = name.with_suffix(name.suffix + ".tmp")
+                array.tofile(tmp_path)
+                os.replace(tmp_path, name)
+            rows = self._conn.execute("SELECT id, document, metadata FROM rows WHERE alive = 1 ORDER BY row").fetchall()
+            self._conn.execute("DELETE FROM rows")
+            self._conn.executemany(
+                "INSERT INTO rows (row, id, document, metadata, alive) VALUES (?, ?, ?, ?, 1)",
+                [(j, *row) for j, row in enumerate(rows)],
+            )
+            self._conn.commit()
+            # 행 번호가 바뀌므로 IVF-PQ 인덱스는 다시 만들어야 함
+            self.ann = None
+            self._load()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+            self._lock_file.close()
+
+
+def export_collection(source, target: MemmapCollection, page_size: int = 1000) -> int:
+    """
+    Chroma Collection의 임베딩 / 문서 / 메타데이터를 MemmapCollection으로 복사
+    (distance 공간도 원본 Collection의 hnsw:space를 따름)
+    """
+    if target.count() == 0 and target.dim is None:
+        target.space = (getattr(source, "metadata", None) or {}).get("hnsw:space", "l2")
+    total = source.count()
+    copied = 0
+    for offset in range(0, total, page_size):
+        page = source.get(limit=page_size, offset=offset, include=["embeddings", "documents", "metadatas"])
+        if not len(page["ids"]):
+            break
+        target.upsert(page["ids"], documents=page["documents"], metadatas=page["metadatas"], embeddings=page["embeddings"])
+        copied += len(page["ids"])
+        print(f"[VectorStore] 복사: {copied}/{total}")
+    return copied
@@ -0,0 +1,104 @@
+import time
+import threading
+from typing import Any, Dict
+
+# 워밍업 질의 (한국어 / 영어 섞어서 토크나이저 경로도 같이 데움)
+WARMUP_QUERIES = [
+    "generative adversarial networks",
+    "트랜스포머 기반 언어 모델의 학습 방법",
+    "diffusion models for image synthesis",
+    "강화학습을 이용한 추천 시스템",
+]
+MIN_ROUNDS = 3
+MAX_ROUNDS = 10
+# 직전 라운드와의 지연 시간 차이가 이 비율 이내면 안정된 것으로 봄
+STEADY_TOLERANCE = 0.2
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {"status": "starting", "steps": {}, "rounds_ms": [], "error": None}
+
+
+def _set(**kwargs) -> None:
+    with _lock:
+        _state.update(kwargs)
+
+
+def _step(name: str, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    with _lock:
+        _state["steps"][name] = round(time.perf_counter() - t0, 3)
+    print(f"[Warmup] {name}: {_state['steps'][name]}s")
+    return result
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    임베딩 모델 / Cross-Encoder / Collection 로드 후 지연 시간이 안정될 때까지 추론 반복
+    """
+    from .chroma_client import get_embedding_function, get_rag_collection, get_memory_collection, get_bm25_index
+    from .reranker import CASCADE_ENABLED, get_reranker, get_first_pass_reranker, predict_pairs
+    from .title_index import get_title_index
+    from .model_server import get_model_client
+
+    _set(status="warming")
+    try:
+        pairs = [[q, q] for q in WARMUP_QUERIES]
+        client = get_model_client()
+        if client is not None:
+            # 모델 서버 모드: 모델은 서버에 있으므로 연결만 확인
+            _step("model_server", client.ping)
+        embedding_fn = _step("embedder", get_embedding_function)
+        if client is None:
+            _step("reranker", get_reranker)
+            if CASCADE_ENABLED:
+                _step("first_pass_reranker", get_first_pass_reranker)
+        if CASCADE_ENABLED:
+            predict_pairs(pairs, first_pass=True)
+        _step("memory_collection", lambda: get_memory_collection().count())
+        collection = _step("rag_collection", get_rag_collection)
+        _step("bm25", lambda: get_bm25_index().count())
+        _step("title_index", get_title_index)
+
+        previous = None
+        for round_no in range(1, MAX_ROUNDS + 1):
+            t0 = time.perf_counter()
+            embeddings = embedding_fn.embed_uncached(WARMUP_QUERIES)
+            if collection.count() > 0:
+                collection.query(query_embeddings=[list(map(float, e)) for e in embeddings[:1]], n_results=5)
+            predict_pairs(pairs)
+            elapsed = (time.perf_counter() - t0) * 1000
+            with _lock:
+                _state["rounds_ms"].append(round(elapsed, 1))
+            if round_no >= MIN_ROUNDS and previous and abs(elapsed - previous) <= STEADY_TOLERANCE * previous:
+                break
+            previous = elapsed
+        _set(status="ready")
+        print(f"[Warmup] 완료 - 라운드별 {_state['rounds_ms']}ms")
+    except Exception as e:
+        _set(status="failed", error=f"{type(e).__name__}: {e}")
+        print(f"[Warmup] 실패: {e}")
+    return readiness()
+
+
+def start_warm_up() -> threading.Thread:
+    """
+    백그라운드 스레드에서 워밍업 시작 (서버는 바로 떠서 /health에 응답)
+    """
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    return _state["status"] == "ready"
+
+
+def readiness() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "status": _state["status"],
+            "steps": dict(_state["steps"]),
+            "rounds_ms": list(_state["rounds_ms"]),
+            "error": _state["error"],
+        }
@@ -1,12 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 import gradio as gr
 import uvicorn
 import uuid
 import time 
 from graph.runner import run_with_stream
+from tools.warmup import start_warm_up, is_ready, readiness
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 시작하자마자 모델 / Collection 로드 + 워밍업 (끝날 때까지 /ready는 503)
+    start_warm_up()
+    yield
+
 
 # FastAPI 앱 생성
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/health")
+def health():
+    """프로세스가 떠 있는지 (liveness)"""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    """워밍업이 끝나 요청을 받아도 되는지 (readiness, 로드밸런서가 폴링)"""
+    state = readiness()
+    return JSONResponse(state, status_code=200 if is_ready() else 503)
 
 with gr.Blocks(title="Transporter", fill_height=True) as demo:
     